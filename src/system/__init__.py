@@ -4,6 +4,7 @@ from tabulate import tabulate
 import os
 import json
 
+from .escalation import DegreeEscalation
 # from .runner_reach_avoid import Runner
 from .runner_reach import Runner
 # from .runner_safe import Runner
@@ -51,7 +52,12 @@ def _translate(label: str, translations: dict[str, str]) -> str:
     return label
 
 
-def benchmark_runner(path, iterations=1, report_mode=False):
+def benchmark_runner(path, iterations=1, report_mode=False, degree=None, max_degree=4, race=1, jobs=1):
+    """
+    `degree` overrides `maximal_polynomial_degree`: either a degree, or "auto" to escalate it from 1 to `max_degree` until
+    the solver returns SAT (with `race` degrees solved in parallel); see `DegreeEscalation`.
+    `jobs` is the number of worker processes generating the constraints.
+    """
     runtimes = []
     stat = True if iterations >= 1 else None
     prob = None
@@ -60,8 +66,13 @@ def benchmark_runner(path, iterations=1, report_mode=False):
 
     for _ in range(iterations):
         start_time = perf_counter()
-        runner_instance = Runner(path, "")
-        runner_instance.run()
+        runner_instance = Runner(path, "", jobs=jobs)
+        if degree == "auto":
+            runner_instance = DegreeEscalation(runner=runner_instance, max_degree=max_degree, race=race).run()
+        elif degree is not None:
+            runner_instance = DegreeEscalation(runner=runner_instance, min_degree=int(degree), max_degree=int(degree)).run()
+        else:
+            runner_instance.run()
         end_time = perf_counter()
         if iterations > 1:
             print(f"Runtime: {end_time - start_time:.3f} seconds")
@@ -99,7 +110,7 @@ def _sort_benchmarks(files: list[str]):
             print(f"Unknown benchmark: {file}")
     return sorted(verifications) + sorted(controls)
 
-def bulk_benchmark_runner(dir_path):
+def bulk_benchmark_runner(dir_path, degree=None, max_degree=4, race=1, jobs=1):
     dir_files = os.listdir(dir_path)
     dir_files = [file for file in dir_files if file.endswith(".yml") or file.endswith(".yaml") or file.endswith(".json")]
     dir_files = _sort_benchmarks(dir_files)
@@ -119,7 +130,11 @@ def bulk_benchmark_runner(dir_path):
             mean_runtime, std_runtime, stat, prob, spec = benchmark_runner(
                 path=os.path.join(dir_path, file),
                 iterations=1,
-                report_mode=True
+                report_mode=True,
+                degree=degree,
+                max_degree=max_degree,
+                race=race,
+                jobs=jobs
             )
             report["Runtime"].append(mean_runtime)
             report["Status"].append("Succeeded" if stat else "Failed")
@@ -8,6 +8,10 @@ parser.add_argument("--input", type=str, nargs="?", default=None, help="Path to
 parser.add_argument("--iterations", type=int, default=1, help="Number of iterations to run the system (default: 1)")
 parser.add_argument("--output", type=str, nargs="?", default="benchmark_results.txt", help="Path to the file you want to dump the results to (default: benchmark_results.txt)")
 parser.add_argument("--dump-log", action="store_true", help="Dump the log of the system to a file (default: False)")
+parser.add_argument("--degree", type=str, default=None, help="Maximal polynomial degree of the templates, or 'auto' to escalate it until the constraints are satisfied; a synthesized policy gets at least this degree (default: the input file's)")
+parser.add_argument("--max-degree", type=int, default=4, help="Highest degree tried with '--degree auto' (default: 4)")
+parser.add_argument("--race", type=int, default=1, help="Number of degrees solved in parallel processes with '--degree auto'; a SAT degree stops the higher ones and the smallest SAT degree is kept (default: 1)")
+parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes generating the constraints (default: 1)")
 parser.add_argument("--visualize", action="store_true", help="Visualize the results of the system (default: False)")
 args = parser.parse_args()
 
@@ -17,15 +21,25 @@ args = parser.parse_args()
 
 if not args.input:
     raise ValueError("Please provide a path to the input file for the system")
+if args.degree is not None and args.degree != "auto" and not (args.degree.isdigit() and int(args.degree) >= 1):
+    raise ValueError(f"Invalid degree ({args.degree}). Give a positive integer or 'auto'.")
 
 if args.visualize:
     convert_results_to_table(dump_file=args.input, output_file=args.output)
 elif os.path.isdir(args.input):
     print("Running the system in bulk mode")
-    table_data = bulk_benchmark_runner(args.input)
+    table_data = bulk_benchmark_runner(args.input, degree=args.degree, max_degree=args.max_degree, race=args.race, jobs=args.jobs)
     dump_results_to_table(table_data)
 elif os.path.isfile(args.input):
-    mean, std, stat, prob, spec = benchmark_runner(path=args.input, iterations=args.iterations, report_mode=True)
+    mean, std, stat, prob, spec = benchmark_runner(
+        path=args.input,
+        iterations=args.iterations,
+        report_mode=True,
+        degree=args.degree,
+        max_degree=args.max_degree,
+        race=args.race,
+        jobs=args.jobs
+    )
     if args.dump_log:
         data = {
             "Experiment": os.path.basename(args.input),
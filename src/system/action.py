@@ -1,12 +1,12 @@
-from copy import deepcopy
 from dataclasses import dataclass, field
 from enum import Enum
 from numbers import Number
-from typing import Sequence, Union, Dict
+from typing import Dict, Optional, Sequence, Union
 
 from .log import logger
 from .polynomial.equation import Equation
 from .polynomial.polynomial import Monomial
+from .template_basis import TemplateBasis
 from .utils import power_generator
 
 
@@ -75,6 +75,7 @@ class SystemControlPolicy:
     transitions: Union[None, Sequence[Equation]] = None
     prefix: str = ""
     type: PolicyType = PolicyType.UNKOWN
+    template_basis: Optional[TemplateBasis] = None
     mode: PolicyMode = field(init=False, default=PolicyMode.SYNTHESIS)
     generated_constants: set[str] = field(init=False, default_factory=set)
     constants_founded: bool = field(init=False, default=False)
@@ -101,15 +102,18 @@ class SystemControlPolicy:
             logger.info("Control policy provided. Verification mode is enabled.")
 
     def update_control_policy(self, new_policy: Sequence[Equation]) -> None:
-        self.transitions = deepcopy(new_policy)
+        self.transitions = list(new_policy)
 
     def _initialize_control_policy(self) -> None:
         logger.info(f"Initializing a control policy template with a maximal degree of {self.maximal_degree}, for space dimension {self.state_dimension} and action space dimension {self.action_dimension}.")
         _transitions = []
-        cp_generator = power_generator(
-            poly_max_degree=self.maximal_degree,
-            variable_generators=self.state_dimension,
-        )
+        if self.template_basis is None:
+            cp_generator = power_generator(
+                poly_max_degree=self.maximal_degree,
+                variable_generators=self.state_dimension,
+            )
+        else:
+            cp_generator = self.template_basis.power_generator("policy", self.maximal_degree)
         variable_generators = [f"S{i}" for i in range(1, self.state_dimension + 1)]
 
         for i in range(1, self.action_dimension+1):
@@ -156,6 +160,7 @@ class SystemDecomposedControlPolicy:
     abstraction_dimension: int  # Number of states in the automata (q in LDBA)
     policies: Sequence[SystemControlPolicy] = None
     limits: Dict[str, float] = field(default_factory=dict)
+    template_basis: Optional[TemplateBasis] = None
     generated_constants: set[str] = field(init=False, default_factory=set)
 
     def __post_init__(self):
@@ -184,7 +189,8 @@ class SystemDecomposedControlPolicy:
                 maximal_degree=self.maximal_degree,
                 transitions=None,
                 prefix=prefix,
-                type=ptype
+                type=ptype,
+                template_basis=self.template_basis
             ) for prefix, ptype in zip(prefixes, types)
         ]
 
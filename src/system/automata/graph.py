@@ -74,6 +74,27 @@ class Automata:
     def get_state(self, state_id: int):
         return self.states[state_id]
 
+    def state_signature(self, state_id: int) -> tuple:
+        """
+        The acceptance status of a state and the structure of its outgoing labels (destinations excluded).
+        """
+        state = self.states[state_id]
+        return (
+            state.acceptance_status,
+            tuple(sorted(state.acc_sig)),
+            tuple(sorted((tr.type.value, tr.label or "", tuple(sorted(tr.acc_sig))) for tr in state.transitions)),
+        )
+
+    def group_states_by_signature(self) -> dict[int, int]:
+        """
+        Maps each state to the first state with the same signature.
+        """
+        representatives = {}
+        return {
+            idx: representatives.setdefault(self.state_signature(idx), idx)
+            for idx in range(len(self.states))
+        }
+
     def to_detailed_string(self):
         start = f"  → {self.start_state_id}"
         sp = " "
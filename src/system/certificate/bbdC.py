@@ -11,6 +11,7 @@ from ..dynamics import SystemDynamics, ConditionalDynamics
 from ..noise import SystemStochasticNoise
 from ..polynomial.equation import Equation
 from ..polynomial.inequality import EquationConditionType, Inequality
+from ..polynomial.sparse import PolynomialComposer, SparsePolynomial
 from ..space import SystemSpace
 
 
@@ -43,7 +44,7 @@ class BuchiBoundedDifferenceConstraint(Constraint):
                     Inequality(
                         left_equation=Equation.extract_equation_from_string(sym),
                         inequality_type=EquationConditionType.GREATER_THAN_OR_EQUAL,
-                        right_equation=Equation.extract_equation_from_string(str(ranges["min"]))
+                        right_equation=Equation.from_polynomial(SparsePolynomial.constant(ranges["min"]))
                     )
                 )
             if "max" in ranges:
@@ -51,7 +52,7 @@ class BuchiBoundedDifferenceConstraint(Constraint):
                     Inequality(
                         left_equation=Equation.extract_equation_from_string(sym),
                         inequality_type=EquationConditionType.LESS_THAN_OR_EQUAL,
-                        right_equation=Equation.extract_equation_from_string(str(ranges["max"]))
+                        right_equation=Equation.from_polynomial(SparsePolynomial.constant(ranges["max"]))
                     )
                 )
 
@@ -112,7 +113,7 @@ class BuchiBoundedDifferenceConstraint(Constraint):
                 )
                 constraints.append(constraint)
 
-    def _extract_bbd_rhs(self, current_state_id: int, next_state_id : int, next_states_under_policies: dict[str, str]) -> SubConstraint:
+    def _extract_bbd_rhs(self, current_state_id: int, next_state_id : int, next_states_under_policies: PolynomialComposer) -> SubConstraint:
         current_v_buchi = self.template_manager.buchi_template.sub_templates[str(current_state_id)]
         next_v_buchi = self.template_manager.buchi_template.sub_templates[str(next_state_id)]
         beta = self.template_manager.variables.Beta_safe_eq
@@ -120,8 +121,7 @@ class BuchiBoundedDifferenceConstraint(Constraint):
 
         current_v_minus_beta = current_v_buchi.sub(beta)
 
-        next_v_buchi_str = next_v_buchi(**next_states_under_policies).replace(" ", "")
-        next_v_buchi_eq = Equation.extract_equation_from_string(next_v_buchi_str)
+        next_v_buchi_eq = next_v_buchi.compose(next_states_under_policies)
         current_v_minus_beta_minus_next_v = current_v_minus_beta.sub(next_v_buchi_eq) # Vbuchi(x,q) - Vbuchi(f(x,pi(x),w),q') - beta
 
         _inequalities = [
@@ -144,9 +144,9 @@ class BuchiBoundedDifferenceConstraint(Constraint):
 
     @staticmethod
     def _next_sds_state_helper(dynamical: ConditionalDynamics, policies: list[SystemControlPolicy]) -> [
-        list[Inequality], list[dict[str, str]]]:
+        list[Inequality], list[PolynomialComposer]]:
         if len(policies) == 0:
-            return dynamical.condition, [dynamical({})]
+            return dynamical.condition, [dynamical.next_state_composer({})]
         _actions = [_policy() for _policy in policies]
-        return dynamical.condition, [dynamical(_action) for _action in _actions]
+        return dynamical.condition, [dynamical.next_state_composer(_action) for _action in _actions]
 
@@ -2,7 +2,6 @@ from dataclasses import dataclass
 from functools import lru_cache
 from typing import Union, Optional
 
-from sympy.physics.units import newton
 
 from ..polynomial.inequality import Inequality
 from .utils import infix_to_prefix
@@ -29,10 +28,9 @@ _ten_chars = "abcdefghij"
 _translation_table = str.maketrans(_zero_to_ten, _ten_chars)
 
 def _list_to_smt_preorder(ineq: list[Inequality], aggregation_type: ConstraintAggregationType) -> str:
-    _str = ineq[0].to_smt_preorder()
-    for ieq in ineq[1:]:
-        _str = f"({operation_to_symbol[aggregation_type][0]} {_str} {ieq.to_smt_preorder()})"
-    return _str
+    if len(ineq) == 1:
+        return ineq[0].to_smt_preorder()
+    return f"({operation_to_symbol[aggregation_type][0]} {' '.join(ieq.to_smt_preorder() for ieq in ineq)})"
 
 
 def _single_to_smt_preorder(ineq: Inequality) -> str:
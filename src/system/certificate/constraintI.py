@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Callable
 
 from .constraint import ConstraintImplication
 
@@ -7,3 +8,10 @@ class Constraint(ABC):
     @abstractmethod
     def extract(self) -> list[ConstraintImplication]:
         pass
+
+    def work_items(self) -> list[Callable[[], list[ConstraintImplication]]]:
+        """
+        Independent pieces of `extract()`: running them in order and concatenating their results gives the same
+        constraints. By default, the whole extraction is a single item.
+        """
+        return [self.extract]
@@ -0,0 +1,77 @@
+from typing import Iterable
+
+from .constraint import ConstraintImplication, GuardedInequality, SubConstraint
+from ..log import logger
+from ..polynomial.coefficient_matrix import CoefficientMatrix
+from ..polynomial.inequality import Inequality
+
+
+class ConstraintDeduplicator:
+    """
+    Drops the constraints that repeat an earlier one, e.g., the expected-decrease constraints of the automaton states
+    that share a template. Two constraints are the same if they quantify the same variables, have the same structure
+    (aggregations and guards), and the same polynomials; the polynomials are compared by the fingerprints of their
+    coefficient matrices (state monomials x unknown monomials), which also tell whether they are linear in the unknowns.
+    """
+    __slots__ = ["unknowns", "dropped", "_seen", "_keys", "_linearity"]
+
+    def __init__(self, unknowns: Iterable[str]):
+        self.unknowns = frozenset(unknowns)
+        self.dropped = 0
+        self._seen = set()
+        self._keys = {}  # id(inequality) -> (inequality, key): the space and invariant inequalities are shared by many constraints
+        self._linearity = {}  # key -> whether the polynomial is linear in the unknowns
+
+    def deduplicate(self, constraints: list) -> list:
+        """
+        The constraints not seen before (in this list or in an earlier call), in their order.
+        """
+        unique = []
+        for constraint in constraints:
+            key = self._key(constraint)
+            if key in self._seen:
+                self.dropped += 1
+                continue
+            self._seen.add(key)
+            unique.append(constraint)
+        return unique
+
+    @property
+    def polynomials(self) -> int:
+        return len(self._linearity)
+
+    @property
+    def linear(self) -> int:
+        return sum(self._linearity.values())
+
+    def log_summary(self) -> None:
+        logger.info(
+            f"Dropped {self.dropped} duplicate constraints; {self.linear} of {self.polynomials} distinct constraint "
+            f"polynomials are linear in the unknowns."
+        )
+
+    def _key(self, expression) -> tuple:
+        if expression is None:
+            return ()
+        if isinstance(expression, list):
+            return tuple(self._key(e) for e in expression)
+        if isinstance(expression, Inequality):
+            return self._inequality_key(expression)
+        if isinstance(expression, GuardedInequality):
+            guard = expression.guard
+            return ("guard", guard.guard, tuple(sorted(guard.lookup_table.items())), expression.aggregation_type, self._key(expression.inequality))
+        if isinstance(expression, SubConstraint):
+            return ("sub", expression.aggregation_type, self._key(expression.expr_1), self._key(expression.expr_2))
+        if isinstance(expression, ConstraintImplication):
+            return ("implication", tuple(expression.variables), self._key(expression.lhs), self._key(expression.rhs))
+        return ("preorder", expression.to_polyhorn_preorder())
+
+    def _inequality_key(self, inequality: Inequality) -> tuple:
+        cached = self._keys.get(id(inequality))
+        if cached is not None:
+            return cached[1]
+        matrix = CoefficientMatrix.from_equation(inequality.left_equation, self.unknowns)  # normalised: left >= 0
+        key = (inequality.inequality_type, matrix.fingerprint())
+        self._linearity[key] = matrix.is_linear()
+        self._keys[id(inequality)] = (inequality, key)
+        return key
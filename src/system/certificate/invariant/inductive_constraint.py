@@ -10,6 +10,7 @@ from ...dynamics import SystemDynamics, ConditionalDynamics
 from ...noise import SystemStochasticNoise
 from ...polynomial.equation import Equation
 from ...polynomial.inequality import EquationConditionType, Inequality
+from ...polynomial.sparse import PolynomialComposer, SparsePolynomial
 from ...space import SystemSpace
 
 
@@ -39,7 +40,7 @@ class InvariantInductiveConstraint(Constraint):
                     Inequality(
                         left_equation=Equation.extract_equation_from_string(sym),
                         inequality_type=EquationConditionType.GREATER_THAN_OR_EQUAL,
-                        right_equation=Equation.extract_equation_from_string(str(ranges["min"]))
+                        right_equation=Equation.from_polynomial(SparsePolynomial.constant(ranges["min"]))
                     )
                 )
             if "max" in ranges:
@@ -47,7 +48,7 @@ class InvariantInductiveConstraint(Constraint):
                     Inequality(
                         left_equation=Equation.extract_equation_from_string(sym),
                         inequality_type=EquationConditionType.LESS_THAN_OR_EQUAL,
-                        right_equation=Equation.extract_equation_from_string(str(ranges["max"]))
+                        right_equation=Equation.from_polynomial(SparsePolynomial.constant(ranges["max"]))
                     )
                 )
 
@@ -131,14 +132,10 @@ class InvariantInductiveConstraint(Constraint):
             implication_lhs,
             all_available_variables,
     ):
-        _next_possible_updated_invariants = (
-            next_possible_invariant(**next_state).replace(" ", "")
+        _next_possible_updated_invariants_eq = (
+            next_possible_invariant.compose(next_state)
             for next_state in next_states_under_policies
         ) # INV(s', q')
-        _next_possible_updated_invariants_eq = (
-            Equation.extract_equation_from_string(_invariant_str)
-            for _invariant_str in _next_possible_updated_invariants
-        )
 
         rhs_inequalities = [
             Inequality(
@@ -158,8 +155,8 @@ class InvariantInductiveConstraint(Constraint):
         )
 
     @staticmethod
-    def _next_sds_state_helper(dynamical: ConditionalDynamics, policies: List[SystemControlPolicy]) -> [List[Inequality], List[Dict[str, str]]]:
+    def _next_sds_state_helper(dynamical: ConditionalDynamics, policies: List[SystemControlPolicy]) -> [List[Inequality], List[PolynomialComposer]]:
         if len(policies) == 0:
-            return dynamical.condition, [dynamical({})]
+            return dynamical.condition, [dynamical.next_state_composer({})]
         _actions = [_policy() for _policy in policies]
-        return dynamical.condition, [dynamical(_action) for _action in _actions]
+        return dynamical.condition, [dynamical.next_state_composer(_action) for _action in _actions]
@@ -1,8 +1,10 @@
 from dataclasses import dataclass, field
+from typing import Optional
 
 from ...polynomial.equation import Equation
 from ...polynomial.inequality import Inequality, EquationConditionType
 from ...polynomial.polynomial import Monomial
+from ...template_basis import TemplateBasis
 from ...utils import power_generator
 
 
@@ -12,6 +14,7 @@ class InvariantTemplate:
     action_dimension: int
     abstraction_dimension: int
     maximal_polynomial_degree: int
+    template_basis: Optional[TemplateBasis] = None
     variable_generators: list[str] = field(init=False, default_factory=list)
     templates: dict[str, Equation] = field(init=False, default_factory=dict)
     generated_constants: set[str]  = field(init=False, default_factory=set)
@@ -21,10 +24,13 @@ class InvariantTemplate:
         self._initialize_templates()
 
     def _initialize_templates(self):
-        cp_generator = power_generator(
-            poly_max_degree=self.maximal_polynomial_degree,
-            variable_generators=self.state_dimension,
-        )
+        if self.template_basis is None:
+            cp_generator = power_generator(
+                poly_max_degree=self.maximal_polynomial_degree,
+                variable_generators=self.state_dimension,
+            )
+        else:
+            cp_generator = self.template_basis.power_generator("invariant", self.maximal_polynomial_degree)
 
         for i in range(self.abstraction_dimension):
             _pre = f"I_{i}"
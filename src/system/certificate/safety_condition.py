@@ -1,7 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from .constraint import ConstraintAggregationType, GuardedInequality, SubConstraint
-from .utils import _replace_keys_with_values, get_policy_action_given_current_abstract_state
+from .utils import get_policy_action_given_current_abstract_state
 from .template import ReachAvoidCertificateDecomposedTemplates
 from ..action import SystemDecomposedControlPolicy
 from ..automata.graph import Automata
@@ -18,42 +18,43 @@ class SafetyConditionHandler:
     decomposed_control_policy: SystemDecomposedControlPolicy
     disturbance: SystemStochasticNoise
     automata: Automata
+    _conditions: dict[tuple[int, int], list[SubConstraint]] = field(init=False, default_factory=dict, repr=False)
 
-    def get_safety_condition(self, current_state: AutomataState, system_dynamics: ConditionalDynamics) -> list[SubConstraint]:
-        return self._extraxt_safe_condition_helper(
-            current_state=current_state,
-            system_dynamics=system_dynamics,
-        )
+    def get_safety_condition(self, current_state: AutomataState, system_dynamics: ConditionalDynamics, branch_index: int) -> list[SubConstraint]:
+        # Memoized per (state, branch), where `branch_index` is the position of `system_dynamics` in the system
+        # transformations: the expected-decrease work items of a state share it, one per transition.
+        key = (current_state.state_id, branch_index)
+        if key not in self._conditions:
+            self._conditions[key] = self._extraxt_safe_condition_helper(
+                current_state=current_state,
+                system_dynamics=system_dynamics,
+            )
+        return self._conditions[key]
 
     def _extraxt_safe_condition_helper(self, current_state: AutomataState, system_dynamics: ConditionalDynamics) -> list[SubConstraint]:
         control_action = get_policy_action_given_current_abstract_state(
             current_state=current_state,
             decomposed_control_policy=self.decomposed_control_policy,
         )   ### TODO: This part can be passed for optimization
-        next_state_under_policy = system_dynamics(control_action)  # Dict: {state_id: StringEquation}   ### TODO: This part can be passed for optimization
+        next_state_under_policy = system_dynamics.next_state_composer(control_action)  # S -> S', cached per (branch, policy)
 
         current_v_safety = self.template_manager.safe_template.sub_templates[str(current_state.state_id)]
         _next_possible_v_safeties = (
             self.template_manager.safe_template.sub_templates[str(tr.destination)]
             for tr in current_state.transitions
         ) # V_{safety}(s, q')
-        next_possible_v_safeties_str = [
-            _v(**next_state_under_policy).replace(" ", "")
+        next_possible_v_safeties = [
+            _v.compose(next_state_under_policy)
             for _v in _next_possible_v_safeties
-        ] # STRING: V_{safety}(s', q')
+        ] # V_{safety}(s', q')
         _next_transitions_label = (
             tr.label
             for tr in current_state.transitions
         )
 
-        disturbance_expectations = self.disturbance.get_expectations()
-        _expected_next_possible_v_safeties_str = (
-            _replace_keys_with_values(_v, disturbance_expectations)
-            for _v in next_possible_v_safeties_str
-        ) # STRING: E[V_{safety}(s', q')]
         _expected_next_possible_v_safeties = (
-            Equation.extract_equation_from_string(_v)
-            for _v in _expected_next_possible_v_safeties_str
+            _v.expect(self.disturbance)
+            for _v in next_possible_v_safeties
         ) # E[V_{safety}(s', q')]
         current_v_sub_safeties_epsilon = current_v_safety.sub(self.template_manager.variables.epsilon_safe_eq) # V_{safety}(s, q) - \epsilon_{Safety}
         _current_v_sub_safeties_epsilon_sub_expected_next_possible_v = (
@@ -81,17 +82,13 @@ class SafetyConditionHandler:
         beta_safety = self.template_manager.variables.Beta_safe_eq
 
         noise_bounds = self.disturbance.get_bounds()
-        lower_bounds = {var: bounds["min"] for var, bounds in noise_bounds.items()}
-        upper_bounds = {var: bounds["max"] for var, bounds in noise_bounds.items()}
+        lower_bounds = Equation.composer({var: bounds["min"] for var, bounds in noise_bounds.items()})
+        upper_bounds = Equation.composer({var: bounds["max"] for var, bounds in noise_bounds.items()})
 
-        _next_possible_v_safeties_bounded = {
-            "lower": (_replace_keys_with_values(_v, lower_bounds) for _v in next_possible_v_safeties_str),
-            "upper": (_replace_keys_with_values(_v, upper_bounds) for _v in next_possible_v_safeties_str),
-        } # STRING: V_{safety}(s', q') with bounds
         _next_possible_v_safeties_eq = {
-            "lower": (Equation.extract_equation_from_string(_v) for _v in _next_possible_v_safeties_bounded["lower"]),
-            "upper": (Equation.extract_equation_from_string(_v) for _v in _next_possible_v_safeties_bounded["upper"]),
-        } # V_{safety}(s', q')
+            "lower": (_v.compose(lower_bounds) for _v in next_possible_v_safeties),
+            "upper": (_v.compose(upper_bounds) for _v in next_possible_v_safeties),
+        } # V_{safety}(s', q') with bounds
         _beta_safety_add_next_possible_v = {
             "lower": (beta_safety.add(_v) for _v in _next_possible_v_safeties_eq["lower"]),
             "upper": (beta_safety.add(_v) for _v in _next_possible_v_safeties_eq["upper"]),
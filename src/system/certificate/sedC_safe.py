@@ -1,9 +1,11 @@
 from dataclasses import dataclass
+from functools import partial
+from typing import Callable
 
 from .constraint import ConstraintImplication, ConstraintAggregationType, SubConstraint, GuardedInequality
 from .constraintI import Constraint
 from .safety_condition import SafetyConditionHandler
-from .utils import _replace_keys_with_values, get_policy_action_given_current_abstract_state
+from .utils import get_policy_action_given_current_abstract_state
 from .invariant.template import InvariantTemplate
 from .template import SafeCertificateTemplates
 from ..action import SystemDecomposedControlPolicy#, PolicyType
@@ -33,80 +35,80 @@ class StrictExpectedDecreaseConstraint(Constraint):
     ]
 
     def extract(self) -> list[ConstraintImplication]:
-        constraints = []
-        for dynamics in self.system_dynamics.system_transformations:
-            self._extract_sed_given_dynamics(constraints=constraints, system_dynamics=dynamics)
-        return constraints
+        return [constraint for item in self.work_items() for constraint in item()]
 
-    def _extract_sed_given_dynamics(self, constraints: list[ConstraintImplication], system_dynamics: ConditionalDynamics):
-        for state in self.automata.states:
-            if state.is_in_accepting_signature(acc_sig=None) or state.is_rejecting():
-                continue
-            self._extract_sed_given_state_and_dynamics(
-                constraints=constraints,
-                current_state=state,
-                system_dynamics=system_dynamics
-            )
+    def work_items(self) -> list[Callable[[], list[ConstraintImplication]]]:
+        """
+        One item per (dynamics branch, automaton state, transition), in the order of the extraction.
+        """
+        return [
+            partial(self._extract_sed_given_transition, system_dynamics=dynamics, branch_index=branch, current_state=state, transition_index=index)
+            for branch, dynamics in enumerate(self.system_dynamics.system_transformations)
+            for state in self.automata.states
+            if not (state.is_in_accepting_signature(acc_sig=None) or state.is_rejecting())
+            for index in range(len(state.transitions))
+        ]
 
-    def _extract_sed_given_state_and_dynamics(self, constraints: list[ConstraintImplication], current_state: AutomataState, system_dynamics: ConditionalDynamics):
+    def _extract_sed_given_transition(self, current_state: AutomataState, system_dynamics: ConditionalDynamics, branch_index: int, transition_index: int) -> list[ConstraintImplication]:
         safety_constraints = self.safety_condition_handler.get_safety_condition(
             current_state=current_state,
-            system_dynamics=system_dynamics
+            system_dynamics=system_dynamics,
+            branch_index=branch_index
         )
         assert len(safety_constraints) == len(current_state.transitions), f"Safety constraints and Current_state.transitions should have the same length. Got {len(safety_constraints)} != {len(current_state.transitions)} for q={current_state.state_id}"
 
-        for tr, safety_constraint in zip(current_state.transitions, safety_constraints):
-            _lhs_inequalities = [
-                Inequality(
-                    left_equation=self.template_manager.template.sub_templates[str(current_state.state_id)],
-                    inequality_type=EquationConditionType.LESS_THAN_OR_EQUAL,
-                    right_equation=self.template_manager.variables.zero_eq,
-                ),
-                self.invariant.get_lhs_invariant(str(current_state.state_id)),
-            ]
-            _lhs_guarded = GuardedInequality(
-                guard=tr.label,
-                inequality=_lhs_inequalities,
-                aggregation_type=ConstraintAggregationType.CONJUNCTION,
-                lookup_table=self.automata.lookup_table,
-            ) # [V_{safety}(s, q) <= 0] and [INV(s,q)] and [X|=a]
-            lhs = SubConstraint(
-                expr_1=self.system_space.space_inequalities + system_dynamics.condition,
-                expr_2=_lhs_guarded,
-                aggregation_type=ConstraintAggregationType.CONJUNCTION,
-            )
+        tr, safety_constraint = current_state.transitions[transition_index], safety_constraints[transition_index]
+        _lhs_inequalities = [
+            Inequality(
+                left_equation=self.template_manager.template.sub_templates[str(current_state.state_id)],
+                inequality_type=EquationConditionType.LESS_THAN_OR_EQUAL,
+                right_equation=self.template_manager.variables.zero_eq,
+            ),
+            self.invariant.get_lhs_invariant(str(current_state.state_id)),
+        ]
+        _lhs_guarded = GuardedInequality(
+            guard=tr.label,
+            inequality=_lhs_inequalities,
+            aggregation_type=ConstraintAggregationType.CONJUNCTION,
+            lookup_table=self.automata.lookup_table,
+        ) # [V_{safety}(s, q) <= 0] and [INV(s,q)] and [X|=a]
+        lhs = SubConstraint(
+            expr_1=self.system_space.space_inequalities + system_dynamics.condition,
+            expr_2=_lhs_guarded,
+            aggregation_type=ConstraintAggregationType.CONJUNCTION,
+        )
 
-            # control_action = get_policy_action_given_current_abstract_state(
-            #     current_state=current_state,
-            #     decomposed_control_policy=self.decomposed_control_policy
-            # )
-            # next_state_under_policy = system_dynamics(control_action)  # Dict: {state_id: StringEquation}
-            # current_v_reach = self.template_manager.reach_template.sub_templates[str(current_state.state_id)]
-            # _next_v_reach = self.template_manager.reach_template.sub_templates[str(tr.destination)]
-            # _next_v_reach_state_str = _next_v_reach(**next_state_under_policy).replace(" ", "") # STRING: V_{buchi}(s', q')
+        # control_action = get_policy_action_given_current_abstract_state(
+        #     current_state=current_state,
+        #     decomposed_control_policy=self.decomposed_control_policy
+        # )
+        # next_state_under_policy = system_dynamics(control_action)  # Dict: {state_id: StringEquation}
+        # current_v_reach = self.template_manager.reach_template.sub_templates[str(current_state.state_id)]
+        # _next_v_reach = self.template_manager.reach_template.sub_templates[str(tr.destination)]
+        # _next_v_reach_state_str = _next_v_reach(**next_state_under_policy).replace(" ", "") # STRING: V_{buchi}(s', q')
 
-            # disturbance_expectations = self.disturbance.get_expectations()
-            # _expected_next_possible_v_reach_str = _replace_keys_with_values(_next_v_reach_state_str, disturbance_expectations) # STRING: E[V_{buchi}(s', q')]
-            # _expected_next_possible_v_reach = Equation.extract_equation_from_string(_expected_next_possible_v_reach_str) # E[V_{buchi}(s', q')]
+        # disturbance_expectations = self.disturbance.get_expectations()
+        # _expected_next_possible_v_reach_str = _replace_keys_with_values(_next_v_reach_state_str, disturbance_expectations) # STRING: E[V_{buchi}(s', q')]
+        # _expected_next_possible_v_reach = Equation.extract_equation_from_string(_expected_next_possible_v_reach_str) # E[V_{buchi}(s', q')]
 
-            # current_v_sub_reaches_epsilon = current_v_reach.sub(self.template_manager.variables.epsilon_reach_eq)  # V_{buchi}(s, q) - \epsilon_{buchi}
-            # _current_v_sub_reach_epsilon_sub_expected_next_possible_v = current_v_sub_reaches_epsilon.sub(_expected_next_possible_v_reach) # V_{buchi}(s, q) - \epsilon_{buchi} - E[V_{buchi}(s', q')]
+        # current_v_sub_reaches_epsilon = current_v_reach.sub(self.template_manager.variables.epsilon_reach_eq)  # V_{buchi}(s, q) - \epsilon_{buchi}
+        # _current_v_sub_reach_epsilon_sub_expected_next_possible_v = current_v_sub_reaches_epsilon.sub(_expected_next_possible_v_reach) # V_{buchi}(s, q) - \epsilon_{buchi} - E[V_{buchi}(s', q')]
 
-            # strict_expected_decrease_inequality = Inequality(
-            #     left_equation=_current_v_sub_reach_epsilon_sub_expected_next_possible_v,
-            #     inequality_type=EquationConditionType.GREATER_THAN_OR_EQUAL,
-            #     right_equation=self.template_manager.variables.zero_eq,
-            # ) # V_{buchi}(s, q) - \epsilon_{buchi} - E[V_{buchi}(s', q')] >= 0
+        # strict_expected_decrease_inequality = Inequality(
+        #     left_equation=_current_v_sub_reach_epsilon_sub_expected_next_possible_v,
+        #     inequality_type=EquationConditionType.GREATER_THAN_OR_EQUAL,
+        #     right_equation=self.template_manager.variables.zero_eq,
+        # ) # V_{buchi}(s, q) - \epsilon_{buchi} - E[V_{buchi}(s', q')] >= 0
 
-            rhs = SubConstraint(
-                expr_1=safety_constraint,
-                # expr_2=strict_expected_decrease_inequality,
-                aggregation_type=ConstraintAggregationType.CONJUNCTION,
-            )
-            constraints.append(
-                ConstraintImplication(
-                    variables=self.template_manager.variable_generators,
-                    lhs=lhs,
-                    rhs=rhs,
-                )
+        rhs = SubConstraint(
+            expr_1=safety_constraint,
+            # expr_2=strict_expected_decrease_inequality,
+            aggregation_type=ConstraintAggregationType.CONJUNCTION,
+        )
+        return [
+            ConstraintImplication(
+                variables=self.template_manager.variable_generators,
+                lhs=lhs,
+                rhs=rhs,
             )
+        ]
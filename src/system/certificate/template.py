@@ -1,10 +1,11 @@
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
-from sympy import log, Pow
+from math import log
 
 from ..polynomial.equation import Equation
 from ..polynomial.polynomial import Monomial
+from ..template_basis import TemplateBasis
 from ..utils import power_generator
 
 
@@ -35,6 +36,8 @@ class CertificateTemplate:
     variable_generators: list[str]
     template_type: CertificateTemplateType
     instance_id: Optional[int] = None  # only for Buchi templates in LDGBA mode
+    template_basis: Optional[TemplateBasis] = None
+    state_groups: Optional[dict[int, int]] = None  # state -> representative state, whose template is shared
     sub_templates: dict[str, Equation] = field(init=False, default_factory=dict)
     generated_constants: set[str] = field(init=False, default_factory=set)
 
@@ -45,12 +48,19 @@ class CertificateTemplate:
 
     def _initialize_templates(self):
         constant_signature = self.template_type.get_signature() + (str(self.instance_id) if self.instance_id is not None else "")
-        cp_generator = power_generator(
-            poly_max_degree=self.maximal_polynomial_degree,
-            variable_generators=self.state_dimension,
-        )
+        if self.template_basis is None:
+            cp_generator = power_generator(
+                poly_max_degree=self.maximal_polynomial_degree,
+                variable_generators=self.state_dimension,
+            )
+        else:
+            cp_generator = self.template_basis.power_generator(self.template_type.value, self.maximal_polynomial_degree)
 
         for i in range(self.abstraction_dimension):
+            representative = self.state_groups.get(i, i) if self.state_groups is not None else i
+            if representative != i:
+                self.sub_templates[str(i)] = self.sub_templates[str(representative)]
+                continue
             _pre = f"{constant_signature}_{i}"
             _monomials = [
                 Monomial(
@@ -142,9 +152,8 @@ class ReachAvoidCertificateVariables:
     def __post_init__(self):
         assert self.delta_safe > 0, "Delta for safety should be greater than 0."
         assert 1 > self.probability_threshold >= 0, "Probability threshold should be in the range [0, 1)."
-        eta_epsilon_upper_bound_generator = 1e-15 + Pow(self.delta_safe,2)*log(1-self.probability_threshold)/8
-        eta_epsilon_upper_bound = eta_epsilon_upper_bound_generator.evalf(n=10)
-        self.eta_epsilon_upper_bound_eq = Equation.extract_equation_from_string(str(eta_epsilon_upper_bound))
+        eta_epsilon_upper_bound = 1e-15 + self.delta_safe**2 * log(1 - self.probability_threshold) / 8
+        self.eta_epsilon_upper_bound_eq = Equation.extract_equation_from_string(f"{eta_epsilon_upper_bound:.10g}")
 
         self.delta_safe_eq = Equation.extract_equation_from_string(f"{self.delta_safe}")
         self.zero_eq = Equation.extract_equation_from_string("0")
@@ -187,9 +196,8 @@ class SafeCertificateVariables:
     def __post_init__(self):
         assert self.delta_safe > 0, "Delta for safety should be greater than 0."
         assert 1 > self.probability_threshold >= 0, "Probability threshold should be in the range [0, 1)."
-        eta_epsilon_upper_bound_generator = 1e-15 + Pow(self.delta_safe,2)*log(1-self.probability_threshold)/8
-        eta_epsilon_upper_bound = eta_epsilon_upper_bound_generator.evalf(n=10)
-        self.eta_epsilon_upper_bound_eq = Equation.extract_equation_from_string(str(eta_epsilon_upper_bound))
+        eta_epsilon_upper_bound = 1e-15 + self.delta_safe**2 * log(1 - self.probability_threshold) / 8
+        self.eta_epsilon_upper_bound_eq = Equation.extract_equation_from_string(f"{eta_epsilon_upper_bound:.10g}")
 
         self.delta_safe_eq = Equation.extract_equation_from_string(f"{self.delta_safe}")
         self.zero_eq = Equation.extract_equation_from_string("0")
@@ -218,6 +226,8 @@ class ReachCertificateTemplates:
     maximal_polynomial_degree: int
     accepting_components_count: int
     variables: ReachCertificateVariables
+    template_basis: Optional[TemplateBasis] = None
+    state_groups: Optional[dict[int, int]] = None
     template: CertificateTemplate = field(init=False)
     variable_generators: list[str] = field(init=False, default_factory=list)
     generated_constants: set[str] = field(init=False, default_factory=set)
@@ -236,7 +246,9 @@ class ReachCertificateTemplates:
             maximal_polynomial_degree=self.maximal_polynomial_degree,
             variable_generators=self.variable_generators,
             template_type=CertificateTemplateType.REACH,
-            instance_id=0
+            instance_id=0,
+            template_basis=self.template_basis,
+            state_groups=self.state_groups
         )
         self.generated_constants.update(self.template.get_generated_constants())
 
@@ -260,6 +272,8 @@ class ReachAvoidCertificateDecomposedTemplates:
     maximal_polynomial_degree: int
     accepting_components_count: int
     variables: ReachAvoidCertificateVariables
+    template_basis: Optional[TemplateBasis] = None
+    state_groups: Optional[dict[int, int]] = None
     reach_template: CertificateTemplate = field(init=False)
     safe_template: CertificateTemplate = field(init=False)
     variable_generators: list[str] = field(init=False, default_factory=list)
@@ -279,7 +293,9 @@ class ReachAvoidCertificateDecomposedTemplates:
             maximal_polynomial_degree=self.maximal_polynomial_degree,
             variable_generators=self.variable_generators,
             template_type=CertificateTemplateType.REACH,
-            instance_id=0
+            instance_id=0,
+            template_basis=self.template_basis,
+            state_groups=self.state_groups
         )
         self.safe_template = CertificateTemplate(
             state_dimension=self.state_dimension,
@@ -288,6 +304,8 @@ class ReachAvoidCertificateDecomposedTemplates:
             maximal_polynomial_degree=self.maximal_polynomial_degree,
             variable_generators=self.variable_generators,
             template_type=CertificateTemplateType.SAFE,
+            template_basis=self.template_basis,
+            state_groups=self.state_groups
         )
         self.generated_constants.update(self.safe_template.get_generated_constants())
         self.generated_constants.update(self.reach_template.get_generated_constants())
@@ -311,6 +329,8 @@ class SafeCertificateTemplates:
     maximal_polynomial_degree: int
     accepting_components_count: int
     variables: SafeCertificateVariables
+    template_basis: Optional[TemplateBasis] = None
+    state_groups: Optional[dict[int, int]] = None
     template: CertificateTemplate = field(init=False)
     variable_generators: list[str] = field(init=False, default_factory=list)
     generated_constants: set[str] = field(init=False, default_factory=set)
@@ -329,6 +349,8 @@ class SafeCertificateTemplates:
             maximal_polynomial_degree=self.maximal_polynomial_degree,
             variable_generators=self.variable_generators,
             template_type=CertificateTemplateType.SAFE,
+            template_basis=self.template_basis,
+            state_groups=self.state_groups
         )
         self.generated_constants.update(self.template.get_generated_constants())
 
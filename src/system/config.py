@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Union
 
 
 __valid_theorems__ = ["handelman", "putinar", "farkas"]
@@ -15,6 +16,10 @@ class SynthesisConfig:
     theorem_name: str
     solver_name: str
     owl_path: str
+    template_basis: Union[str, dict] = "dense"
+    template_sharing: Union[str, list] = "none"
+    symmetry: str = "none"
+    rescaling: str = "none"
 
     def __post_init__(self):
         if self.maximal_polynomial_degree < 1:
@@ -1,14 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict
 
 from .polynomial.equation import Equation
 from .polynomial.inequality import Inequality
+from .polynomial.sparse import PolynomialComposer
 
 
 @dataclass
 class ConditionalDynamics:
     condition: List[Inequality]
     dynamics: List[Equation]
+    _composers: Dict[frozenset, PolynomialComposer] = field(default_factory=dict, init=False, repr=False, compare=False)
 
     def condition_to_string(self):
         return " and ".join([c.to_detailed_string() for c in self.condition])
@@ -16,12 +18,26 @@ class ConditionalDynamics:
     def __len__(self):
         return len(self.dynamics)
 
-    def __call__(self, args) -> Dict[str, str]:
+    def __call__(self, args: Dict[str, Equation]) -> Dict[str, Equation]:
+        """
+        Returns the next state (one equation per state variable), with the actions substituted by the provided policy.
+        """
         return {
-            f"S{i}": transformer(**args)
+            f"S{i}": transformer.compose(args)
             for i, transformer in enumerate(self.dynamics, start=1)
         }
 
+    def next_state_composer(self, args: Dict[str, Equation]) -> PolynomialComposer:
+        """
+        The next-state map under the provided policy, as a composer (cached per policy): any template V can be composed
+        as `V.compose(composer)`, reusing the expansions of the next-state monomials across templates and transitions.
+        """
+        key = frozenset(args.items())
+        composer = self._composers.get(key)
+        if composer is None:
+            composer = Equation.composer(self(args))
+            self._composers[key] = composer
+        return composer
 
 
 @dataclass
@@ -0,0 +1,162 @@
+import copy
+import dataclasses
+import multiprocessing
+import os
+import signal
+from multiprocessing.connection import wait
+from typing import Any
+
+from .log import logger
+
+
+@dataclasses.dataclass
+class DegreeEscalation:
+    """
+    Finds the smallest template degree (`maximal_polynomial_degree`) for which the solver returns SAT: the degree starts
+    at `min_degree` and is escalated on UNSAT or an unknown result (e.g., a timeout), up to `max_degree`.
+    The degree of the synthesized policy is escalated too: at degree d, it is max(d, the policy degree of the input).
+    The degree-independent stages (parsing, automaton, system construction and rescaling) run once; each degree continues
+    from a copy of that runner, so the automaton, the parsed system, the next-state composers and the power caches are
+    shared by all the degrees. With `race` > 1, that many consecutive degrees are solved in parallel (forked) processes;
+    a SAT degree stops the higher degrees of the batch (with the solver processes they started), and the lower ones are
+    still waited for, so the smallest SAT degree is found as in the sequential search.
+    """
+    runner: Any
+    min_degree: int = 1
+    max_degree: int = 4
+    race: int = 1
+    results: dict[int, str] = dataclasses.field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        if not 1 <= self.min_degree <= self.max_degree:
+            raise ValueError(f"Invalid degree range ({self.min_degree}..{self.max_degree}).")
+        if self.race < 1:
+            raise ValueError(f"The number of raced degrees must be positive, got {self.race}.")
+        if self.race > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            logger.warning("Racing degrees needs the 'fork' start method; the degrees are tried one by one.")
+            self.race = 1
+
+    def run(self):
+        """
+        Returns the runner of the first SAT degree, or of the last degree tried.
+        """
+        self._prepare()
+        degree = self.min_degree
+        while degree <= self.max_degree:
+            degrees = list(range(degree, min(degree + self.race, self.max_degree + 1)))
+            runner = self._run_sequential(degrees[0]) if len(degrees) == 1 else self._run_race(degrees)
+            if runner.history["solver_result"]["is_sat"] == "sat":
+                break
+            degree = degrees[-1] + 1
+        logger.info(f"Degree escalation: {self.results}.")
+        return runner
+
+    def _prepare(self) -> None:
+        stages = type(self.runner.running_stage)
+        while self.runner.running_stage != stages.POLICY_PREPARATION:
+            self.runner.stage_runners[self.runner.running_stage]()
+            self.runner.running_stage = self.runner.running_stage.next()
+
+    def _runner_for(self, degree: int):
+        """
+        A copy of the prepared runner at the given degree; the shared history is copied shallowly, and the degree
+        dependent stages only add new entries to it.
+        """
+        runner = copy.copy(self.runner)
+        runner.history = dict(self.runner.history)
+        initiator = copy.copy(self.runner.history["initiator"])
+        initiator.synthesis_config_pre = dict(initiator.synthesis_config_pre, maximal_polynomial_degree=degree)
+        initiator.actions_pre = dict(initiator.actions_pre, maximal_degree=max(degree, initiator.actions_pre["maximal_degree"]))
+        runner.history["initiator"] = initiator
+        runner.history["synthesis"] = dataclasses.replace(self.runner.history["synthesis"], maximal_polynomial_degree=degree)
+        runner.output_path = os.path.join(self.runner.output_path, f"degree_{degree}")
+        runner.__post_init__()  # rebinds the stage runners to the copy
+        return runner
+
+    def _run_sequential(self, degree: int):
+        print(f"+ Trying degree {degree}.")
+        runner = self._runner_for(degree)
+        runner.run()
+        self.results[degree] = runner.history["solver_result"]["is_sat"]
+        return runner
+
+    def _run_race(self, degrees: list[int]):
+        print(f"+ Racing degrees {degrees}.")
+        context = multiprocessing.get_context("fork")
+        workers, connections = {}, {}
+        sat, last = None, None  # (degree, solver result) of the smallest SAT degree and of the highest degree solved
+        try:
+            for degree in degrees:
+                receiver, sender = context.Pipe(duplex=False)
+                workers[degree] = context.Process(target=_race_worker, args=(self, degree, sender), daemon=True)
+                workers[degree].start()
+                sender.close()
+                _make_group_leader(workers[degree].pid)
+                connections[receiver] = degree
+            while connections:
+                for connection in wait(list(connections)):
+                    if connection not in connections:
+                        continue  # stopped by a smaller SAT degree of the same wait
+                    degree = connections.pop(connection)
+                    try:
+                        solver_result = connection.recv()
+                    except EOFError:
+                        raise RuntimeError(f"The worker of degree {degree} exited without a result.")
+                    finally:
+                        connection.close()
+                    if isinstance(solver_result, BaseException):
+                        raise solver_result
+                    self.results[degree] = solver_result["is_sat"]
+                    if last is None or degree > last[0]:
+                        last = (degree, solver_result)
+                    if solver_result["is_sat"] == "sat" and (sat is None or degree < sat[0]):
+                        sat = (degree, solver_result)
+                        for other in [c for c, d in connections.items() if d > degree]:
+                            _stop_worker(workers[connections.pop(other)])
+                            other.close()
+        finally:
+            for worker in workers.values():
+                _stop_worker(worker)
+        # Only the solver result (with the model) comes back from the worker; the runner keeps the shared history.
+        degree, solver_result = sat or last
+        runner = self._runner_for(degree)
+        runner.history["solver_result"] = solver_result
+        runner.running_stage = type(runner.running_stage).Done
+        return runner
+
+
+def _race_worker(escalation: DegreeEscalation, degree: int, connection) -> None:
+    _make_group_leader(0)
+    try:
+        runner = escalation._runner_for(degree)
+        runner.run()
+        connection.send(runner.history["solver_result"])
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+
+def _make_group_leader(pid: int) -> None:
+    """
+    Puts a race worker (0: this process) in its own process group, so that it can be stopped with the processes it
+    starts (e.g., the solver). Both the worker and the parent call it, whichever runs first.
+    """
+    try:
+        os.setpgid(pid, 0)
+    except OSError:
+        pass  # the worker has already done it (or has exited)
+
+
+def _stop_worker(worker: multiprocessing.Process, grace: float = 1.0) -> None:
+    """
+    Stops a race worker and every process left in its group (also after the worker has exited, e.g., a solver it
+    started): SIGTERM first, then SIGKILL after `grace` seconds.
+    """
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(worker.pid, sig)
+        except ProcessLookupError:
+            break  # no process is left in the group
+        worker.join(timeout=grace)
+    worker.join()
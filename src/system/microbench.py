@@ -0,0 +1,461 @@
+"""
+Micro-benchmarks for the polynomial layer of the pipeline.
+
+Usage (from the `src` directory):
+    python3 -m system.microbench parser --input benchmark
+    python3 -m system.microbench terms --input benchmark
+    python3 -m system.microbench synthetic
+    python3 -m system.microbench matrix --input benchmark
+    python3 -m system.microbench evaluator
+    python3 -m system.microbench emission
+    python3 -m system.microbench composition
+    python3 -m system.microbench exponents
+"""
+import argparse
+import contextlib
+import io
+import os
+import tracemalloc
+from itertools import product
+from time import perf_counter
+
+import numpy as np
+from tabulate import tabulate
+
+from .certificate.constraint import ConstraintImplication, ConstraintAggregationType, SubConstraint, GuardedInequality, _list_to_smt_preorder
+from .polynomial.coefficient_matrix import CoefficientMatrix
+from .polynomial.equation import Equation
+from .polynomial.evaluator import PolynomialEvaluator
+from .polynomial.inequality import Inequality, EquationConditionType
+from .polynomial.parse_cache import parse_cache
+from .polynomial.polynomial import Monomial, PolynomialParser
+from .polyhorn_helper import CommunicationBridge
+from .runner_reach import Runner, RunningStage
+from .utils import _bounded_exponents, exponent_matrix, power_generator
+
+
+def _list_configs(path: str) -> list[str]:
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, file)
+        for file in os.listdir(path)
+        if file.endswith(".json") and ("verification" in file or "control" in file)
+    )
+
+
+def _run_until_solver(path: str) -> tuple[Runner, dict[str, float]]:
+    """
+    Runs the pipeline stages up to (excluding) the solver and returns the runner and the wall-time of each stage.
+    """
+    runner = Runner(path, "")
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        while runner.running_stage not in (RunningStage.RUN_SOLVER, RunningStage.Done):
+            stage = runner.running_stage
+            start_time = perf_counter()
+            runner.stage_runners[stage]()
+            timings[stage.name] = perf_counter() - start_time
+            runner.running_stage = stage.next()
+    return runner, timings
+
+
+def _iter_inequalities(node):
+    """
+    Yields all the inequalities of a constraint, or a (nested) collection of constraints.
+    """
+    if node is None:
+        return
+    if isinstance(node, (list, tuple)):
+        for n in node:
+            yield from _iter_inequalities(n)
+    elif isinstance(node, dict):
+        for n in node.values():
+            yield from _iter_inequalities(n)
+    elif isinstance(node, Inequality):
+        yield node
+    elif isinstance(node, GuardedInequality):
+        yield from _iter_inequalities(node.inequality)
+    elif isinstance(node, SubConstraint):
+        yield from _iter_inequalities(node.expr_1)
+        yield from _iter_inequalities(node.expr_2)
+    elif isinstance(node, ConstraintImplication):
+        yield from _iter_inequalities(node.lhs)
+        yield from _iter_inequalities(node.rhs)
+    else:
+        yield from _iter_inequalities(getattr(node, "sub_constraints", None))
+
+
+def _count_terms(node) -> int:
+    """
+    Counts the monomials of all the (in)equalities in a constraint, or a (nested) collection of constraints.
+    """
+    return sum(i.left_equation.term_count() + i.right_equation.term_count() for i in _iter_inequalities(node))
+
+
+@contextlib.contextmanager
+def _sympy_parser():
+    """
+    Within the block, all the polynomial strings are parsed by SymPy instead of the native parser. The parse cache is
+    cleared on entry and on exit, so that no parse is shared between the two parsers.
+    """
+    parse = PolynomialParser.__dict__["parse"]
+    PolynomialParser.parse = staticmethod(PolynomialParser._parse_with_sympy)
+    parse_cache.clear()
+    try:
+        yield
+    finally:
+        PolynomialParser.parse = parse
+        parse_cache.clear()
+
+
+def benchmark_parser(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Compares the SymPy and the native polynomial parser on the GENERATE_CONSTRAINTS stage (and all the stages before the solver).
+    """
+    report = []
+    for config in _list_configs(path):
+        row = {"Experiment": os.path.basename(config)}
+        try:
+            for backend in ["sympy", "native"]:
+                with _sympy_parser() if backend == "sympy" else contextlib.nullcontext():
+                    runs = [_run_until_solver(config)[1] for _ in range(repeat)]
+                row[f"Constraints[{backend}]"] = min(r[RunningStage.GENERATE_CONSTRAINTS.name] for r in runs)
+                row[f"Total[{backend}]"] = min(sum(r.values()) for r in runs)
+        except Exception as e:
+            print(f"Failed to run the experiment {config}: {e}")
+            continue
+        row["Speed-up"] = row["Constraints[sympy]"] / row["Constraints[native]"]
+        report.append(row)
+    return report
+
+
+def _append_monomial(monomials: list[Monomial], index: dict, monomial: Monomial) -> None:
+    if not monomial.is_zero():
+        monomials.append(monomial)
+
+
+@contextlib.contextmanager
+def _appended_like_terms():
+    """
+    Within the block, `Equation`s append their monomials as they are, without merging the like terms.
+    """
+    merge_monomial = Equation.__dict__["_merge_monomial"]
+    Equation._merge_monomial = staticmethod(_append_monomial)
+    try:
+        yield
+    finally:
+        Equation._merge_monomial = merge_monomial
+
+
+def benchmark_terms(path: str, repeat: int = 1) -> list[dict]:
+    """
+    Compares the number of monomials (and the size of the SMT input) with and without merging like terms in `Equation`.
+    """
+    report = []
+    for config in _list_configs(path):
+        row = {"Experiment": os.path.basename(config)}
+        try:
+            for mode, merged in [("appended", False), ("merged", True)]:
+                with contextlib.nullcontext() if merged else _appended_like_terms():
+                    runner, _ = _run_until_solver(config)
+                    constraints = {**runner.history.get("invariant_constraints", {}), **runner.history["constraints"]}
+                    row[f"Terms[{mode}]"] = _count_terms(constraints)
+                    row[f"SMT chars[{mode}]"] = len(CommunicationBridge.get_input_string(generated_constants=set(), **constraints))
+        except Exception as e:
+            print(f"Failed to run the experiment {config}: {e}")
+            continue
+        row["Reduction (%)"] = 100 * (1 - row["Terms[merged]"] / row["Terms[appended]"])
+        report.append(row)
+    return report
+
+
+def benchmark_matrix(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Converts every constraint polynomial to its coefficient matrix (state monomials x unknown monomials) and reports the
+    conversion time, how many polynomials are linear in the unknowns, and how many are duplicates.
+    """
+    report = []
+    for config in _list_configs(path):
+        try:
+            runner, _ = _run_until_solver(config)
+        except Exception as e:
+            print(f"Failed to run the experiment {config}: {e}")
+            continue
+        unknowns = (
+            runner.history["control policy"].get_generated_constants()
+            | runner.history["template"].get_generated_constants()
+            | runner.history["invariant template"].get_generated_constants()
+        )
+        constraints = {**runner.history.get("invariant_constraints", {}), **runner.history["constraints"]}
+        equations = [i.left_equation.sub(i.right_equation) for i in _iter_inequalities(constraints)]
+        times = []
+        for _ in range(repeat):
+            start_time = perf_counter()
+            matrices = [CoefficientMatrix.from_equation(equation, unknowns) for equation in equations]
+            times.append(perf_counter() - start_time)
+        report.append({
+            "Experiment": os.path.basename(config),
+            "Polynomials": len(matrices),
+            "Linear": sum(m.is_linear() for m in matrices),
+            "Unique": len(set(matrices)),
+            "Max shape": max((m.shape for m in matrices), key=lambda shape: shape[0] * shape[1], default=(0, 0)),
+            "Non-zeros": sum(m.nnz for m in matrices),
+            "Time (s)": min(times),
+        })
+    return report
+
+
+def _synthetic_workload(dimension: int, degree: int) -> tuple[int, int]:
+    """
+    Mimics the expected-decrease generator on a synthetic system: a full template of the given degree over `dimension`
+    state variables is composed with a coupled, disturbed next-state map, subtracted from itself, and emitted as SMT.
+    """
+    variable_generators = [f"S{i}" for i in range(1, dimension + 1)]
+    template = Equation(monomials=[
+        Monomial(
+            coefficient=1,
+            variable_generators=variable_generators + [f"V_reach0_0_{const_postfix}"],
+            power=powers + (1,)
+        ) for (const_postfix, powers) in power_generator(poly_max_degree=degree, variable_generators=dimension)
+    ])
+    next_state = {
+        f"S{i}": Equation.extract_equation_from_string(f"S{i} + 0.5 * S{i % dimension + 1} + D{i}")
+        for i in range(1, dimension + 1)
+    }
+    next_template = template.compose(next_state)
+    decrease = template.sub(next_template)
+    decrease.to_smt_preorder()
+    return template.term_count(), decrease.term_count()
+
+
+def benchmark_synthetic(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Reports the wall-time and the peak memory of the polynomial layer on high-dimension synthetic templates (`path` is unused).
+    """
+    report = []
+    for dimension, degree in [(4, 3), (6, 3), (8, 3), (10, 3), (6, 4), (8, 4)]:
+        times = []
+        for _ in range(repeat):
+            start_time = perf_counter()
+            template_terms, decrease_terms = _synthetic_workload(dimension, degree)
+            times.append(perf_counter() - start_time)
+        tracemalloc.start()
+        _synthetic_workload(dimension, degree)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report.append({
+            "Dimension": dimension,
+            "Degree": degree,
+            "Template terms": template_terms,
+            "Decrease terms": decrease_terms,
+            "Time (s)": min(times),
+            "Peak memory (MiB)": peak / 2 ** 20,
+        })
+    return report
+
+
+def benchmark_evaluator(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Evaluates a synthetic certificate (a full template with random coefficients, one per automaton state) on a batch of
+    points, with the compiled monomial-basis evaluator and point by point through `Equation.compose` (`path` is unused).
+    """
+    report = []
+    rng = np.random.default_rng(0)
+    for dimension, degree, states in [(2, 2, 3), (4, 3, 5), (6, 4, 5)]:
+        variables = [f"S{i}" for i in range(1, dimension + 1)]
+        exponents = power_generator(poly_max_degree=degree, variable_generators=dimension)
+        certificates = {
+            f"q{q}": Equation(monomials=[
+                Monomial(coefficient=1, variable_generators=variables + [f"V_reach0_{q}_{const_postfix}"], power=powers + (1,))
+                for (const_postfix, powers) in exponents
+            ])
+            for q in range(states)
+        }
+        model = {f"V_reach0_{q}_{const_postfix}": rng.normal() for q in range(states) for const_postfix, _ in exponents}
+        points = rng.uniform(-1, 1, size=(100_000, dimension))
+
+        start_time = perf_counter()
+        evaluator = PolynomialEvaluator.from_dict(certificates, variables, model)
+        compile_time = perf_counter() - start_time
+        vectorised = min(_timed(lambda: evaluator(points)) for _ in range(repeat))
+
+        sample = points[:100]
+        start_time = perf_counter()
+        for point in sample:
+            for certificate in certificates.values():
+                certificate.compose({**model, **dict(zip(variables, point.tolist()))})
+        pointwise = (perf_counter() - start_time) / len(sample)
+
+        report.append({
+            "Dimension": dimension,
+            "Degree": degree,
+            "States": states,
+            "Basis size": evaluator.exponents.shape[0],
+            "Compile (s)": compile_time,
+            "Batch of 1e5 (s)": vectorised,
+            "Per point, vectorised (us)": 1e6 * vectorised / len(points),
+            "Per point, compose (us)": 1e6 * pointwise,
+        })
+    return report
+
+
+def _nested_smt_preorder(node) -> str:
+    """
+    The previous SMT emission, with binary (+ (+ a b) c) / (* (* c x) y) / (and (and p q) r) nesting; kept as a reference.
+    """
+    if isinstance(node, list):
+        _str = _nested_smt_preorder(node[0])
+        for item in node[1:]:
+            _str = f"(and {_str} {_nested_smt_preorder(item)})"
+        return _str
+    if isinstance(node, Inequality):
+        return f"({node.inequality_type.value} {_nested_smt_preorder(node.left_equation)} {_nested_smt_preorder(node.right_equation)})"
+    if isinstance(node, Equation):
+        if node.is_zero():
+            return "0"
+        _str = _nested_smt_preorder(node.monomials[0])
+        for m in node.monomials[1:]:
+            _str = f"(+ {_str} {_nested_smt_preorder(m)})"
+        return _str
+    _str = str(node.coefficient)
+    for v, p in zip(node.variable_generators, node.power):
+        factor = v
+        for _ in range(p - 1):
+            factor = f"(* {factor} {v})"
+        _str = f"(* {_str} {factor})"
+    return _str
+
+
+def benchmark_emission(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Compares the nested-binary and the n-ary SMT emission of expected-decrease-like constraints over degree-3 templates
+    in 4 dimensions: one inequality per automaton state, aggregated in one conjunction (`path` is unused).
+    """
+    report = []
+    dimension, degree = 4, 3
+    variables = [f"S{i}" for i in range(1, dimension + 1)]
+    next_state = {
+        f"S{i}": Equation.extract_equation_from_string(f"S{i} + 0.5 * S{i % dimension + 1} + D{i}")
+        for i in range(1, dimension + 1)
+    }
+    for states in [1, 5, 20, 50]:
+        inequalities = []
+        for q in range(states):
+            template = Equation(monomials=[
+                Monomial(coefficient=1, variable_generators=variables + [f"V_reach0_{q}_{const_postfix}"], power=powers + (1,))
+                for (const_postfix, powers) in power_generator(poly_max_degree=degree, variable_generators=dimension)
+            ])
+            inequalities.append(Inequality(
+                left_equation=template.sub(template.compose(next_state)),
+                inequality_type=EquationConditionType.GREATER_THAN_OR_EQUAL,
+                right_equation=Equation()
+            ))
+        nested = min(_timed(lambda: _nested_smt_preorder(inequalities)) for _ in range(repeat))
+        n_ary = min(_timed(lambda: _list_to_smt_preorder(inequalities, ConstraintAggregationType.CONJUNCTION)) for _ in range(repeat))
+        report.append({
+            "States": states,
+            "Terms": _count_terms(inequalities),
+            "Time, nested (s)": nested,
+            "Time, n-ary (s)": n_ary,
+            "Size, nested (chars)": len(_nested_smt_preorder(inequalities)),
+            "Size, n-ary (chars)": len(_list_to_smt_preorder(inequalities, ConstraintAggregationType.CONJUNCTION)),
+        })
+    return report
+
+
+def benchmark_composition(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Composes the templates of all the automaton states with one next-state map (as the expected-decrease generator does
+    for every transition of a dynamics branch), with a fresh substitution per composition and with one cached composer
+    per (branch, policy) (`path` is unused).
+    """
+    report = []
+    for dimension, degree, states in [(2, 2, 5), (4, 3, 5), (6, 3, 10), (6, 4, 5)]:
+        variables = [f"S{i}" for i in range(1, dimension + 1)]
+        exponents = power_generator(poly_max_degree=degree, variable_generators=dimension)
+        templates = [
+            Equation(monomials=[
+                Monomial(coefficient=1, variable_generators=variables + [f"V_reach0_{q}_{const_postfix}"], power=powers + (1,))
+                for (const_postfix, powers) in exponents
+            ])
+            for q in range(states)
+        ]
+        next_state = {
+            f"S{i}": Equation.extract_equation_from_string(f"S{i} + 0.5 * S{i % dimension + 1} + D{i} + A{i}")
+            for i in range(1, dimension + 1)
+        }
+        per_transition = min(_timed(lambda: [template.compose(next_state) for template in templates]) for _ in range(repeat))
+        cached = min(_timed(lambda: [template.compose(composer) for template in templates])
+                     for composer in (Equation.composer(next_state) for _ in range(repeat)))
+        report.append({
+            "Dimension": dimension,
+            "Degree": degree,
+            "States": states,
+            "Template terms": templates[0].term_count(),
+            "Per transition (s)": per_transition,
+            "Cached per branch (s)": cached,
+        })
+    return report
+
+
+def _filtered_power_combinations(poly_max_degree: int, len_v: int) -> tuple:
+    """
+    The previous enumeration of `power_generator`: all of product(range(d + 1), repeat=n), filtered by total degree.
+    """
+    return tuple(powers for powers in product(range(poly_max_degree + 1), repeat=len_v) if sum(powers) <= poly_max_degree)
+
+
+def benchmark_exponents(path: str, repeat: int = 3) -> list[dict]:
+    """
+    Compares the filtered (d + 1)^n enumeration with the direct graded one of `exponent_matrix` (uncached and cached),
+    up to n = 10 variables and degree d = 4 (`path` is unused).
+    """
+    report = []
+    for dimension, degree in [(2, 2), (4, 3), (6, 3), (6, 4), (8, 4), (10, 3), (10, 4)]:
+        filtered = min(_timed(lambda: _filtered_power_combinations(degree, dimension)) for _ in range(repeat))
+        direct = []
+        for _ in range(repeat):
+            _bounded_exponents.cache_clear()
+            exponent_matrix.cache_clear()
+            direct.append(_timed(lambda: exponent_matrix(degree, dimension)))
+        cached = min(_timed(lambda: exponent_matrix(degree, dimension)) for _ in range(repeat))
+        report.append({
+            "Variables": dimension,
+            "Degree": degree,
+            "Monomials": exponent_matrix(degree, dimension).shape[0],
+            "Candidates, filtered": (degree + 1) ** dimension,
+            "Filtered (s)": filtered,
+            "Direct (s)": min(direct),
+            "Cached (s)": cached,
+        })
+    return report
+
+
+def _timed(function) -> float:
+    start_time = perf_counter()
+    function()
+    return perf_counter() - start_time
+
+
+_benchmarks = {
+    "parser": benchmark_parser,
+    "terms": benchmark_terms,
+    "synthetic": benchmark_synthetic,
+    "matrix": benchmark_matrix,
+    "evaluator": benchmark_evaluator,
+    "emission": benchmark_emission,
+    "composition": benchmark_composition,
+    "exponents": benchmark_exponents,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the polynomial layer.")
+    parser.add_argument("name", choices=sorted(_benchmarks.keys()), help="The benchmark to run.")
+    parser.add_argument("--input", type=str, default="benchmark", help="Path to a benchmark config or a directory of configs (default: benchmark)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    table = _benchmarks[args.name](args.input, repeat=args.repeat)
+    print(tabulate(table, headers="keys", tablefmt="grid", floatfmt=".4f"))
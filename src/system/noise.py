@@ -1,16 +1,34 @@
+import hashlib
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from numbers import Number
+from typing import ClassVar
 
-__valid__distributions__ = ["normal", "uniform"]
+import numpy as np
+
+from .log import logger
+from .polynomial.coefficients import Coefficients
+from .polynomial.moments import MomentProvider
+from .utils import exponent_matrix
+
+__valid__distributions__ = ["normal", "uniform", "multivariate_normal", "empirical"]
 
 
 class NoiseGenerator(ABC):
+    dimension: int
+    independent: ClassVar[bool] = True
+
     @abstractmethod
-    def get_expectations(self, order) -> dict[str, str]:
+    def get_moments(self, order: int) -> np.ndarray:
+        """
+        Returns the (dimension x (order + 1)) table of the raw moments: moments[dim, k] = E[D_{dim + 1}**k].
+        The entries are floats, or `mpq` rationals in the exact coefficient mode.
+        """
         pass
 
     @abstractmethod
-    def get_bounds(self) -> dict[str, dict[str, str]]:
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
         pass
 
 
@@ -28,19 +46,6 @@ class NormalNoiseGenerator(NoiseGenerator):
     std_dev: list[float]
     dimension: int
 
-    __expectation_table__ = [
-        lambda mu, sigma: mu,
-        lambda mu, sigma: mu**2 + sigma**2,
-        lambda mu, sigma: mu**3 + 3*mu*sigma**2,
-        lambda mu, sigma: mu**4 + 6*mu**2*sigma**2 + 3*sigma**4,
-        lambda mu, sigma: mu**5 + 10*mu**3*sigma**2 + 15*mu*sigma**4,
-        lambda mu, sigma: mu**6 + 15*mu**4*sigma**2 + 45*mu**2*sigma**4 + 15*sigma**6,
-        lambda mu, sigma: mu**7 + 21*mu**5*sigma**2 + 105*mu**3*sigma**4 + 105*mu*sigma**6,
-        lambda mu, sigma: mu**8 + 28*mu**6*sigma**2 + 210*mu**4*sigma**4 + 420*mu**2*sigma**6 + 105*sigma**8,
-        lambda mu, sigma: mu**9 + 36*mu**7*sigma**2 + 378*mu**5*sigma**4 + 1260*mu**3*sigma**6 + 945*mu*sigma**8,
-        lambda mu, sigma: mu**10 + 45*mu**8*sigma**2 + 630*mu**6*sigma**4 + 3150*mu**4*sigma**6 + 4725*mu**2*sigma**8 + 945*sigma**10
-    ]
-
     def __post_init__(self):
         """
         Initializes the random number generator after the dataclass has been created.
@@ -50,28 +55,10 @@ class NormalNoiseGenerator(NoiseGenerator):
         if len(self.std_dev) != self.dimension:
             raise ValueError(f"Dimension of standard deviation vector ({len(self.std_dev)}) does not match the specified dimension ({self.dimension}).")
 
-    def get_expectations(self, order=10) -> dict[str, str]:
-        """
-        Returns the expected values of the noise distribution.
-        """
-        if order > 10:
-            raise ValueError("Expectations higher than order 10 are not supported for the normal distribution.")
-
-        _exp = [
-            [self.__expectation_table__[i](self.mean[j], self.std_dev[j])
-            for i in range(order)]
-            for j in range(self.dimension)
-        ]
-        refined_disturbance_expectations = {
-            f"D{dim + 1}**{i}": str(d)
-            for dim in range(len(_exp))
-            for i, d in enumerate(_exp[dim], start=1)
-        }
-        for dim in range(len(_exp)):
-            refined_disturbance_expectations[f"D{dim + 1}"] = str(_exp[dim][0])
-        return refined_disturbance_expectations
+    def get_moments(self, order: int) -> np.ndarray:
+        return _normal_moments(_coefficient_array(self.mean), _coefficient_array(self.std_dev) ** 2, order)
 
-    def get_bounds(self) -> dict[str, dict[str, str]]:
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
         return {}
 
 
@@ -102,61 +89,271 @@ class UniformNoiseGenerator(NoiseGenerator):
         if any(lb >= ub for lb, ub in zip(self.lower_bound, self.upper_bound)):
             raise ValueError("Each lower bound must be less than the corresponding upper bound.")
 
-    def get_expectations(self, order=2) -> dict[str, str]:
+    def get_moments(self, order: int) -> np.ndarray:
         """
-        Returns the expected values of the noise distribution for the uniform distribution.
-
-        Args:
-            order (int): The highest order of expectations to compute (currently supports up to order 2).
+        Raw moments of U(a, b): m_k = (b^{k+1} - a^{k+1}) / ((k + 1)(b - a)) = h_k / (k + 1), where
+        h_k = sum_{j <= k} a^j b^{k-j} is computed by h_k = b * h_{k-1} + a^k (no cancellation when a is close to b).
+        """
+        a = _coefficient_array(self.lower_bound)
+        b = _coefficient_array(self.upper_bound)
+        moments = np.empty((self.dimension, order + 1), dtype=a.dtype)
+        moments[:, 0] = 1
+        h, a_power = moments[:, 0].copy(), moments[:, 0].copy()
+        for k in range(1, order + 1):
+            a_power = a_power * a
+            h = b * h + a_power
+            moments[:, k] = h / (k + 1)
+        return moments
+
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
+        """
+        Returns the bounds of the uniform distribution for each dimension.
 
         Returns:
-            dict[str, str]: A dictionary containing the expectations for each dimension.
+            dict[str, dict[str, Number]]: A dictionary containing the bounds for each dimension.
         """
-        if order > 2:
-            raise ValueError("Expectations higher than order 2 are not supported for the uniform distribution.")
+        return {
+            f"D{dim + 1}": {
+                "min": Coefficients.from_value(self.lower_bound[dim]),
+                "max": Coefficients.from_value(self.upper_bound[dim])
+            }
+            for dim in range(self.dimension)
+        }
 
-        expectations = {}
-        for dim in range(self.dimension):
-            a = self.lower_bound[dim]
-            b = self.upper_bound[dim]
 
-            mean = (a + b) / 2
-            expectations[f"D{dim + 1}"] = str(mean)
-            expectations[f"D{dim + 1}**1"] = str(mean)
+@dataclass
+class MultivariateNormalNoiseGenerator(NoiseGenerator):
+    """
+    A Gaussian disturbance with correlated components, N(mean, covariance).
 
-            if order >= 2:
-                # Second moment (2nd-order expectation)
-                second_moment = (a ** 2 + a * b + b ** 2) / 3
-                expectations[f"D{dim + 1}**2"] = str(second_moment)
+    Attributes:
+        mean (list[float]): Mean vector.
+        covariance (list[list[float]]): Covariance matrix (symmetric, positive semi-definite).
+        dimension (int): Dimension of the noise to generate.
+    """
+    mean: list[float]
+    covariance: list[list[float]]
+    dimension: int
+    _mixed_moments: dict[tuple[int, ...], Number] = field(init=False, repr=False, default_factory=dict)
 
-        return expectations
+    independent: ClassVar[bool] = False
 
-    def get_bounds(self) -> dict[str, dict[str, str]]:
+    def __post_init__(self):
+        if len(self.mean) != self.dimension:
+            raise ValueError(f"Dimension of mean vector ({len(self.mean)}) does not match the specified dimension ({self.dimension}).")
+        if len(self.covariance) != self.dimension or any(len(row) != self.dimension for row in self.covariance):
+            raise ValueError(f"The covariance matrix must be {self.dimension}x{self.dimension}.")
+        covariance = np.asarray(self.covariance, dtype=np.float64)
+        if not np.allclose(covariance, covariance.T):
+            raise ValueError("The covariance matrix must be symmetric.")
+        if np.linalg.eigvalsh(covariance).min() < -1e-12 * max(1.0, np.abs(covariance).max()):
+            raise ValueError("The covariance matrix must be positive semi-definite.")
+
+    def get_moments(self, order: int) -> np.ndarray:
         """
-        Returns the bounds of the uniform distribution for each dimension.
+        Raw moments of the marginals N(mean_i, covariance_ii).
+        """
+        variance = _coefficient_array([self.covariance[i][i] for i in range(self.dimension)])
+        return _normal_moments(_coefficient_array(self.mean), variance, order)
 
-        Returns:
-            dict[str, dict[str, str]]: A dictionary containing the bounds for each dimension.
+    def get_mixed_moment(self, exponents: tuple[int, ...]) -> Number:
         """
+        E[prod_i D_i**k_i], by the Isserlis/Wick recurrence (Stein's lemma): for the first j with k_j > 0,
+            M(k) = mean_j M(k - e_j) + sum_l covariance_jl (k - e_j)_l M(k - e_j - e_l).
+        Memoised per exponent vector, so that a moment of total order K costs at most prod_i (k_i + 1) steps of O(dim).
+        """
+        moment = self._mixed_moments.get(exponents)
+        if moment is not None:
+            return moment
+        if not any(exponents):
+            return 1
+        j = next(i for i, k in enumerate(exponents) if k)
+        rest = list(exponents)
+        rest[j] -= 1
+        moment = Coefficients.from_value(self.mean[j]) * self.get_mixed_moment(tuple(rest))
+        for l, k in enumerate(rest):
+            if k and self.covariance[j][l] != 0:
+                lowered = list(rest)
+                lowered[l] -= 1
+                moment = moment + Coefficients.from_value(self.covariance[j][l]) * k * self.get_mixed_moment(tuple(lowered))
+        self._mixed_moments[exponents] = moment
+        return moment
+
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
+        return {}
+
+
+@dataclass
+class _EmpiricalSummary:
+    """
+    The statistics of a sample file computed so far (as floats); shared by all the generators reading the same file.
+    """
+    count: int
+    lower_bound: np.ndarray
+    upper_bound: np.ndarray
+    moments: np.ndarray
+    mixed_moments: dict[tuple[int, ...], float] = field(default_factory=dict)
+    mixed_degree: int = 0
+
+
+_empirical_summaries: dict[str, _EmpiricalSummary] = {}
+
+
+@dataclass
+class EmpiricalNoiseGenerator(NoiseGenerator):
+    """
+    A disturbance given by logged samples: an (N x dimension) array in a `.npy` file (or a vector of N samples when the
+    dimension is 1). The file is memory-mapped and all the statistics (raw and mixed moments, support bounds) are computed
+    in streaming passes of `chunk_size` samples, so it may be larger than the memory. They are cached by the SHA-256 of
+    the file, and a mixed moment of total degree K computes all the mixed moments up to degree K in the same pass.
+
+    Attributes:
+        samples_path (str): Path of the `.npy` sample file.
+        dimension (int): Dimension of the noise.
+        chunk_size (int): Number of samples per pass.
+    """
+    samples_path: str
+    dimension: int
+    chunk_size: int = 1 << 16
+    _samples: np.ndarray = field(init=False, repr=False)
+    _summary: _EmpiricalSummary = field(init=False, repr=False)
+
+    independent: ClassVar[bool] = False
+
+    def __post_init__(self):
+        if not os.path.isfile(self.samples_path):
+            raise FileNotFoundError(f"Sample file not found: {self.samples_path}")
+        if self.chunk_size < 1:
+            raise ValueError(f"The chunk size must be positive, got {self.chunk_size}.")
+        samples = np.load(self.samples_path, mmap_mode="r")
+        if samples.ndim == 1 and self.dimension == 1:
+            samples = samples.reshape(-1, 1)
+        if samples.ndim != 2 or samples.shape[1] != self.dimension:
+            raise ValueError(f"Expected samples of shape (N, {self.dimension}), got {samples.shape} in {self.samples_path}.")
+        if samples.shape[0] == 0:
+            raise ValueError(f"No samples in {self.samples_path}.")
+        self._samples = samples
+
+        digest = _file_digest(self.samples_path)
+        if digest not in _empirical_summaries:
+            _empirical_summaries[digest] = self._summarise()
+            logger.info(f"Summarised {samples.shape[0]} disturbance samples from {self.samples_path}.")
+        self._summary = _empirical_summaries[digest]
+
+    def _chunks(self):
+        for start in range(0, self._samples.shape[0], self.chunk_size):
+            yield np.asarray(self._samples[start:start + self.chunk_size], dtype=np.float64)
+
+    def _summarise(self) -> _EmpiricalSummary:
+        lower_bound = np.full(self.dimension, np.inf)
+        upper_bound = np.full(self.dimension, -np.inf)
+        for chunk in self._chunks():
+            np.minimum(lower_bound, chunk.min(axis=0), out=lower_bound)
+            np.maximum(upper_bound, chunk.max(axis=0), out=upper_bound)
+        summary = _EmpiricalSummary(
+            count=self._samples.shape[0],
+            lower_bound=lower_bound,
+            upper_bound=upper_bound,
+            moments=np.ones((self.dimension, 1)),
+            mixed_moments={(0,) * self.dimension: 1.0},
+        )
+        return summary
+
+    def _extend_moments(self, order: int) -> None:
+        sums = np.zeros((self.dimension, order + 1))
+        for chunk in self._chunks():
+            power = np.ones_like(chunk)
+            for k in range(order + 1):
+                sums[:, k] += power.sum(axis=0)
+                power *= chunk
+        self._summary.moments = sums / self._summary.count
+
+    def _extend_mixed_moments(self, degree: int) -> None:
+        exponents = [tuple(e) for e in exponent_matrix(degree, self.dimension).tolist()]
+        sums = np.zeros(len(exponents))
+        for chunk in self._chunks():
+            # powers[k] = chunk ** k, so that a monomial is a product of one column per dimension.
+            powers = np.empty((degree + 1,) + chunk.shape)
+            powers[0] = 1
+            for k in range(1, degree + 1):
+                powers[k] = powers[k - 1] * chunk
+            columns = np.arange(self.dimension)
+            for i, e in enumerate(exponents):
+                sums[i] += powers[e, :, columns].prod(axis=0).sum()
+        self._summary.mixed_moments = dict(zip(exponents, (sums / self._summary.count).tolist()))
+        self._summary.mixed_degree = degree
+
+    def get_moments(self, order: int) -> np.ndarray:
+        if order >= self._summary.moments.shape[1]:
+            self._extend_moments(order)
+        moments = self._summary.moments[:, :order + 1]
+        if Coefficients.is_exact():
+            moments = np.vectorize(Coefficients.from_value, otypes=[object])(moments)
+        return moments
+
+    def get_mixed_moment(self, exponents: tuple[int, ...]) -> Number:
+        if not any(exponents):
+            return 1
+        if sum(exponents) > self._summary.mixed_degree:
+            self._extend_mixed_moments(sum(exponents))
+        return Coefficients.from_value(self._summary.mixed_moments[tuple(exponents)])
+
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
         return {
             f"D{dim + 1}": {
-                "min": str(self.lower_bound[dim]),
-                "max": str(self.upper_bound[dim])
+                "min": Coefficients.from_value(float(self._summary.lower_bound[dim])),
+                "max": Coefficients.from_value(float(self._summary.upper_bound[dim]))
             }
             for dim in range(self.dimension)
         }
 
 
+def _file_digest(path: str, block_size: int = 1 << 24) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _normal_moments(mu: np.ndarray, variance: np.ndarray, order: int) -> np.ndarray:
+    """
+    Raw moments of N(mu, variance), by the recurrence m_k = mu * m_{k-1} + (k - 1) * variance * m_{k-2}.
+    """
+    moments = np.empty((len(mu), order + 1), dtype=mu.dtype)
+    moments[:, 0] = 1
+    if order >= 1:
+        moments[:, 1] = mu
+    for k in range(2, order + 1):
+        moments[:, k] = mu * moments[:, k - 1] + (k - 1) * variance * moments[:, k - 2]
+    return moments
+
+
+def _coefficient_array(values: list[float]) -> np.ndarray:
+    """
+    A float vector, or an object vector of `mpq` rationals in the exact coefficient mode.
+    """
+    if Coefficients.is_exact():
+        return np.array([Coefficients.from_value(v) for v in values], dtype=object)
+    return np.asarray(values, dtype=np.float64)
+
+
 @dataclass
-class SystemStochasticNoise:
+class SystemStochasticNoise(MomentProvider):
     """
     Represents a system with stochastic noise generators.
+    Unless the distribution is correlated (multivariate_normal, empirical), the disturbance components D1, ..., Dn are independent,
+    so mixed moments are products of per-component moments.
+    The moments are kept in a (dimension x order) table, computed once and extended to the highest order that is asked
+    for; the bounds are cached as well.
     """
 
     dimension: int
     distribution_name: str
     distribution_generator_parameters: dict
     noise_generators: NoiseGenerator = field(init=False)
+    moments: np.ndarray = field(init=False, repr=False)
+    _bounds: dict[str, dict[str, Number]] = field(init=False, repr=False)
 
     def __post_init__(self):
         if self.distribution_name not in __valid__distributions__:
@@ -167,9 +364,37 @@ class SystemStochasticNoise:
             self.noise_generators = NormalNoiseGenerator(dimension=self.dimension, **self.distribution_generator_parameters)
         elif self.distribution_name == "uniform":
             self.noise_generators = UniformNoiseGenerator(dimension=self.dimension, **self.distribution_generator_parameters)
-
-    def get_expectations(self, max_deg=2) -> dict[str, str]:
-        return self.noise_generators.get_expectations(max_deg)
-
-    def get_bounds(self) -> dict[str, dict[str, str]]:
-        return self.noise_generators.get_bounds()
+        elif self.distribution_name == "multivariate_normal":
+            self.noise_generators = MultivariateNormalNoiseGenerator(dimension=self.dimension, **self.distribution_generator_parameters)
+        elif self.distribution_name == "empirical":
+            self.noise_generators = EmpiricalNoiseGenerator(dimension=self.dimension, **self.distribution_generator_parameters)
+
+        self.moments = _moment_table(self.noise_generators, 2)
+        self._bounds = self.noise_generators.get_bounds()
+
+    def get_bounds(self) -> dict[str, dict[str, Number]]:
+        return self._bounds
+
+    @property
+    def variables(self) -> list[str]:
+        return [f"D{i}" for i in range(1, self.dimension + 1)]
+
+    def get_moment(self, dim: int, order: int) -> Number:
+        if order >= self.moments.shape[1]:
+            # The table is extended to the highest order in D that is actually asked for (e.g., by `Equation.expect`).
+            self.moments = _moment_table(self.noise_generators, order)
+        return self.moments[dim, order]
+
+    def moment(self, exponents: tuple[int, ...]) -> Number:
+        if not self.noise_generators.independent:
+            return self.noise_generators.get_mixed_moment(exponents)
+        value = 1
+        for dim, order in enumerate(exponents):
+            if order != 0:
+                value = value * self.get_moment(dim, order)
+        return value
+
+
+def _moment_table(generator: NoiseGenerator, order: int) -> np.ndarray:
+    # An object array of plain Python numbers (floats or mpq), which are used as polynomial coefficients as is.
+    return generator.get_moments(order).astype(object)
@@ -0,0 +1,55 @@
+import multiprocessing
+from typing import Any, Callable, Sequence
+
+from .log import logger
+
+
+_tasks: Sequence[Callable[[], Any]] = ()  # The tasks of the running pool; inherited by the forked workers, not pickled.
+
+
+def can_fork(jobs: int) -> bool:
+    """
+    Whether `jobs` worker processes can be forked from this process; daemonic processes (e.g., the workers of a degree
+    race) cannot have children.
+    """
+    return jobs > 1 and "fork" in multiprocessing.get_all_start_methods() and not multiprocessing.current_process().daemon
+
+
+def run_tasks(tasks: Sequence[Callable[[], Any]], jobs: int = 1, chunks_per_job: int = 4) -> list:
+    """
+    Runs the tasks in up to `jobs` forked processes and returns their results in the order of the tasks.
+    The tasks (and everything they read) are shipped once, by forking; only the results are pickled back.
+    The tasks are handed out in contiguous chunks, about `chunks_per_job` per process, to the first idle process, so
+    that uneven tasks are balanced while neighbouring tasks (that often share cached work) stay in the same process.
+    Without more than one job (or without fork), the tasks run one after another in this process.
+    """
+    global _tasks
+    if not can_fork(jobs) or len(tasks) < 2:
+        if jobs > 1 and len(tasks) > 1:
+            logger.info("Worker processes cannot be forked here; running the tasks sequentially.")
+        return [task() for task in tasks]
+    _tasks = tasks
+    try:
+        processes = min(jobs, len(tasks))
+        chunksize = max(1, len(tasks) // (processes * chunks_per_job))
+        with multiprocessing.get_context("fork").Pool(processes=processes) as pool:
+            return pool.map(_run_task, range(len(tasks)), chunksize=chunksize)
+    finally:
+        _tasks = ()
+
+
+def extract_constraints(generators: dict[str, Any], jobs: int = 1) -> dict[str, list]:
+    """
+    Runs the work items of all the constraint generators (see `Constraint.work_items`) as one pool of tasks (see
+    `run_tasks`); the constraints are keyed as the generators, each in the order of its `extract()`.
+    """
+    items = [(key, item) for key, generator in generators.items() for item in generator.work_items()]
+    results = run_tasks([item for _, item in items], jobs=jobs)
+    constraints = {key: [] for key in generators}
+    for (key, _), result in zip(items, results):
+        constraints[key].extend(result)
+    return constraints
+
+
+def _run_task(index: int) -> Any:
+    return _tasks[index]()
@@ -1,6 +1,7 @@
 import json
 import os.path
 from .certificate.constraint import ConstraintImplication
+from .certificate.deduplication import ConstraintDeduplicator
 
 from polyhorn.main import execute
 
@@ -13,6 +14,13 @@ class CommunicationBridge:
 
     @staticmethod
     def get_input_string(generated_constants: set[str], **certificate: list[ConstraintImplication]) -> str:
+        """
+        The SMT input of the solver; the constraints that repeat an earlier one are dropped (see `ConstraintDeduplicator`).
+        """
+        deduplicator = ConstraintDeduplicator(unknowns=generated_constants)
+        certificate = {key: deduplicator.deduplicate(constraints) for key, constraints in certificate.items()}
+        deduplicator.log_summary()
+
         constants = "\n".join(
             CommunicationBridge.__constant_definition_template.format(const_name=const)
             for const in generated_constants
@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Tuple
+
+import numpy as np
+
+from .coefficients import Coefficients
+from .equation import Equation
+from .polynomial import Monomial
+from .symbols import basis, symbols, unpack
+
+
+@lru_cache(maxsize=2 ** 16)
+def _split_monomial(key: int, unknown_ids: FrozenSet[int]) -> Tuple[int, int]:
+    """
+    Splits an interned monomial into its (state, unknown) factors, both interned.
+    """
+    state, unknown = [], []
+    for packed in basis.exponents(key):
+        (unknown if unpack(packed)[0] in unknown_ids else state).append(packed)
+    return basis.intern(tuple(state)), basis.intern(tuple(unknown))
+
+
+@dataclass(frozen=True, eq=False)
+class CoefficientMatrix:
+    """
+    A constraint polynomial p(S, c) = sum_k values[k] * m_{rows[k]}(S) * u_{columns[k]}(c), stored as a sparse (COO) matrix:
+    the rows are the monomials over the state (and disturbance) variables, the columns the monomials over the unknown
+    coefficients c. In verification mode every column is a single unknown (the constraint is linear in c); in control
+    synthesis, a column may be the product of a template and a policy unknown (bilinear).
+    `row_monomials` and `column_monomials` hold the interned monomial ids of the rows and the columns, in increasing order.
+    The values are float64, or Python objects (the exact rationals) in the "exact" coefficient mode.
+    """
+    row_monomials: np.ndarray
+    column_monomials: np.ndarray
+    rows: np.ndarray
+    columns: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def from_equation(cls, equation: Equation, unknowns: Iterable[str]) -> "CoefficientMatrix":
+        unknown_ids = frozenset(symbol_id for name in unknowns if (symbol_id := symbols.lookup(name)) is not None)
+        count = len(equation.monomials)
+        row_keys = np.empty(count, dtype=np.int64)
+        column_keys = np.empty(count, dtype=np.int64)
+        values = np.empty(count, dtype=object if Coefficients.is_exact() else np.float64)
+        for i, monomial in enumerate(equation.monomials):
+            row_keys[i], column_keys[i] = _split_monomial(monomial.get_exponent_key(), unknown_ids)
+            values[i] = monomial.coefficient
+        return cls._from_keys(row_keys, column_keys, values)
+
+    @classmethod
+    def _from_keys(cls, row_keys: np.ndarray, column_keys: np.ndarray, values: np.ndarray) -> "CoefficientMatrix":
+        """
+        Builds the matrix from (row monomial, column monomial, value) triplets, summing duplicates and dropping zeros.
+        """
+        row_monomials, rows = np.unique(row_keys, return_inverse=True)
+        column_monomials, columns = np.unique(column_keys, return_inverse=True)
+        entries, positions = np.unique(rows * len(column_monomials) + columns, return_inverse=True)
+        summed = np.zeros(len(entries), dtype=values.dtype)
+        np.add.at(summed, positions, values)
+        nonzero = np.asarray(summed != 0, dtype=bool)
+        return cls(
+            row_monomials=row_monomials,
+            column_monomials=column_monomials,
+            rows=entries[nonzero] // max(len(column_monomials), 1),
+            columns=entries[nonzero] % max(len(column_monomials), 1),
+            values=summed[nonzero],
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.row_monomials), len(self.column_monomials)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.values)
+
+    def unknown_degrees(self) -> np.ndarray:
+        """
+        The degree of each column monomial in the unknowns (0 for the columns of the unknown-free terms).
+        """
+        return np.fromiter((basis.degree(key) for key in self.column_monomials), dtype=np.int64, count=len(self.column_monomials))
+
+    def is_linear(self) -> bool:
+        return bool(np.all(self.unknown_degrees()[self.columns] <= 1))
+
+    def linear_fragment(self) -> "CoefficientMatrix":
+        """
+        Keeps only the entries that are at most linear in the unknowns.
+        """
+        mask = self.unknown_degrees()[self.columns] <= 1
+        return CoefficientMatrix._from_keys(
+            self.row_monomials[self.rows[mask]], self.column_monomials[self.columns[mask]], self.values[mask]
+        )
+
+    def add(self, other: "CoefficientMatrix") -> "CoefficientMatrix":
+        return CoefficientMatrix._from_keys(
+            np.concatenate([self.row_monomials[self.rows], other.row_monomials[other.rows]]),
+            np.concatenate([self.column_monomials[self.columns], other.column_monomials[other.columns]]),
+            np.concatenate([self.values, other.values]),
+        )
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros(self.shape, dtype=np.float64)
+        np.add.at(dense, (self.rows, self.columns), self.values)
+        return dense
+
+    def to_equation(self) -> Equation:
+        return Equation(monomials=tuple(
+            Monomial.from_exponent_key(value, basis.product(int(self.row_monomials[r]), int(self.column_monomials[c])))
+            for r, c, value in zip(self.rows, self.columns, self.values.tolist())
+        ))
+
+    def fingerprint(self) -> bytes:
+        """
+        A canonical byte string of the matrix (entries sorted by their row and column monomials); two polynomials have
+        equal fingerprints within a process iff they are equal (exactly, also in the "exact" coefficient mode), which makes
+        it suitable for de-duplicating constraints.
+        """
+        row_keys, column_keys = self.row_monomials[self.rows], self.column_monomials[self.columns]
+        order = np.lexsort((column_keys, row_keys))
+        values = self.values[order]
+        values = values.tobytes() if values.dtype != object else repr(values.tolist()).encode()
+        return b"".join([np.int64(self.nnz).tobytes(), row_keys[order].tobytes(), column_keys[order].tobytes(), values])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CoefficientMatrix):
+            return False
+        return self.fingerprint() == other.fingerprint()
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint())
+
+    def __str__(self) -> str:
+        return f"CoefficientMatrix({self.shape[0]}x{self.shape[1]}, nnz={self.nnz}, linear={self.is_linear()})"
+
@@ -0,0 +1,91 @@
+from fractions import Fraction
+from numbers import Number
+
+from . import logger
+
+
+__valid_coefficient_modes__ = ["float", "exact"]
+
+
+class Coefficients:
+    """
+    The numeric type of the polynomial coefficients, shared by the parser, the polynomial layer and the moment tables.
+    In the "float" mode (default), coefficients are Python ints/floats, printed with `str`.
+    In the "exact" mode, coefficients are gmpy2 `mpq` rationals: user decimals are rationalised with a bounded denominator
+    (when this is exact up to `tolerance`), and non-integers are printed as `(/ p q)` in SMT.
+    """
+    mode: str = "float"
+    max_denominator: int = 10 ** 6
+    tolerance: float = 1e-12
+
+    @staticmethod
+    def configure(mode: str = "float", max_denominator: int = 10 ** 6) -> None:
+        if mode not in __valid_coefficient_modes__:
+            logger.error(f"Invalid coefficient mode ({mode}). Choose one of {__valid_coefficient_modes__}.")
+            raise ValueError(f"Invalid coefficient mode ({mode}). Choose one of {__valid_coefficient_modes__}.")
+        if max_denominator < 1:
+            raise ValueError(f"The maximal denominator must be positive, got {max_denominator}.")
+        if mode == "exact":
+            _mpq()
+        Coefficients.mode = mode
+        Coefficients.max_denominator = max_denominator
+        logger.info(f"Coefficient mode set to '{mode}' (maximal denominator: {max_denominator}).")
+
+    @staticmethod
+    def is_exact() -> bool:
+        return Coefficients.mode == "exact"
+
+    @staticmethod
+    def from_literal(literal: str) -> Number:
+        """
+        Converts a numeric literal of a polynomial string (e.g., "2", "0.5", "1e-15") to a coefficient.
+        """
+        if Coefficients.is_exact():
+            return Coefficients._rationalise(Fraction(literal))
+        if all(ch.isdigit() for ch in literal):
+            return int(literal)
+        return float(literal)
+
+    @staticmethod
+    def from_value(value: Number) -> Number:
+        """
+        Converts a computed (or user-given) number to a coefficient; a no-op in the "float" mode.
+        """
+        if not Coefficients.is_exact() or isinstance(value, int):
+            return value
+        return Coefficients._rationalise(Fraction(value))
+
+    @staticmethod
+    def _rationalise(value: Fraction):
+        approximation = value.limit_denominator(Coefficients.max_denominator)
+        if abs(approximation - value) <= Coefficients.tolerance * abs(value):
+            value = approximation
+        return _mpq()(value.numerator, value.denominator)
+
+    @staticmethod
+    def to_string(value: Number) -> str:
+        """
+        Prints a coefficient so that it can be substituted into a polynomial string, e.g., "(1/3)".
+        """
+        if _is_fraction(value):
+            return f"({value})"
+        return str(value)
+
+    @staticmethod
+    def to_smt(value: Number) -> str:
+        if _is_fraction(value):
+            return f"(/ {value.numerator} {value.denominator})"
+        return str(value)
+
+
+def _is_fraction(value: Number) -> bool:
+    return not isinstance(value, (int, float)) and getattr(value, "denominator", 1) != 1
+
+
+def _mpq():
+    try:
+        from gmpy2 import mpq
+    except ImportError as e:
+        logger.error("gmpy2 is required for the exact coefficient mode, but it is not installed.")
+        raise ValueError("gmpy2 is required for the exact coefficient mode, but it is not installed.") from e
+    return mpq
@@ -1,46 +1,82 @@
-from copy import deepcopy
 from dataclasses import dataclass, field
-from typing import List
+from numbers import Number
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
+from .moments import MomentProvider
+from .parse_cache import parse_cache
 from .polynomial import Monomial, PolynomialParser
+from .sparse import PolynomialComposer, SparsePolynomial, ExponentKey
+from .symbols import basis, symbols, unpack
 
 
-@dataclass
+@dataclass(frozen=True)
 class Equation:
     """"
     Each equation is a sequence of monomials, summing together to form a polynomial.
+    Like terms are merged on insertion: `_index` maps the exponent key of each monomial to its position in `monomials`,
+    so no two monomials share the same variables and powers, and no monomial has a zero coefficient.
+    Equations are immutable: operations return a new equation that shares the (immutable) monomials of its operands.
     """
-    monomials: List[Monomial] = field(default_factory=list)
+    monomials: Tuple[Monomial, ...] = ()
+    _index: Dict[ExponentKey, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _signature: Optional[FrozenSet] = field(default=None, init=False, repr=False, compare=False)
 
-    def add_monomial(self, monomial: Monomial) -> None:
+    def __post_init__(self):
+        monomials, index = [], {}
+        for monomial in self.monomials:
+            Equation._merge_monomial(monomials, index, monomial)
+        object.__setattr__(self, "monomials", tuple(monomials))
+        object.__setattr__(self, "_index", index)
+
+    @staticmethod
+    def _merge_monomial(monomials: List[Monomial], index: Dict[ExponentKey, int], monomial: Monomial) -> None:
         if monomial.is_zero():
             return
-        # for i in range(len(self.monomials)):
-        #     _add = self.monomials[i].add(monomial)
-        #     if _add is not None:
-        #         self.monomials[i] = _add
-        #         return
-        self.monomials.append(monomial)
+        key = monomial.get_exponent_key()
+        position = index.get(key)
+        if position is None:
+            index[key] = len(monomials)
+            monomials.append(monomial)
+            return
+        merged = monomials[position].add(monomial)
+        if not merged.is_zero():
+            monomials[position] = merged
+            return
+        # The terms cancel out: move the last monomial into the freed position.
+        del index[key]
+        last = monomials.pop()
+        if position < len(monomials):
+            monomials[position] = last
+            index[last.get_exponent_key()] = position
+
+    def _extend(self, others: Iterable[Monomial]) -> "Equation":
+        """
+        Returns a new equation with `others` merged in; the monomials and the index of `self` are left untouched.
+        """
+        monomials, index = list(self.monomials), dict(self._index)
+        for monomial in others:
+            Equation._merge_monomial(monomials, index, monomial)
+        new_equation = object.__new__(Equation)
+        object.__setattr__(new_equation, "monomials", tuple(monomials))
+        object.__setattr__(new_equation, "_index", index)
+        object.__setattr__(new_equation, "_signature", None)
+        return new_equation
+
+    def add_monomial(self, monomial: Monomial) -> "Equation":
+        return self._extend((monomial,))
 
-    def negate(self) -> None:
-        for i in range(len(self.monomials)):
-            self.monomials[i] = self.monomials[i].negate()
+    def negate(self) -> "Equation":
+        return Equation(monomials=tuple(m.negate() for m in self.monomials))
 
     def add(self, other: "Equation") -> "Equation":
         if not isinstance(other, Equation):
             raise TypeError(f"Expected Equation, got {type(other)}")
-        new_equation = deepcopy(self)
-        for monomial in other.monomials:
-            new_equation.add_monomial(monomial)
-        return new_equation
+        return self._extend(other.monomials)
 
     def sub(self, other: "Equation") -> "Equation":
         if not isinstance(other, Equation):
             raise TypeError(f"Expected Equation, got {type(other)}")
-        new_equation = deepcopy(self)
-        for monomial in other.monomials:
-            new_equation.add_monomial(monomial.negate())
-        return new_equation
+        return self._extend(m.negate() for m in other.monomials)
 
     def is_numeric(self) -> bool:
         return len(self.monomials) == 1 and all([m.is_numeric() for m in self.monomials])
@@ -48,6 +84,41 @@ class Equation:
     def is_zero(self) -> bool:
         return all([m.coefficient == 0 for m in self.monomials]) or len(self.monomials) == 0
 
+    def term_count(self) -> int:
+        return len(self.monomials)
+
+    def canonical(self) -> "Equation":
+        """
+        Returns the equation with like terms merged and the monomials in graded lexicographic order (the constant last).
+        Two canonical equations are equal iff their monomial sequences are equal, coefficient by coefficient.
+        """
+        polynomial = self.to_polynomial()
+        keys = sorted(polynomial.terms.keys(), key=lambda key: (-basis.degree(key), basis.decode(key)))
+        return Equation(monomials=tuple(Monomial.from_exponent_key(polynomial.terms[key], key) for key in keys))
+
+    def signature(self) -> FrozenSet:
+        """
+        The canonical, order-independent form of the equation: the set of (monomial key, coefficient) pairs; cached.
+        """
+        if self._signature is None:
+            object.__setattr__(self, "_signature", frozenset(self.to_polynomial().terms.items()))
+        return self._signature
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Equation):
+            return False
+        return self is other or self.signature() == other.signature()
+
+    def __hash__(self) -> int:
+        return hash(self.signature())
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # The index is keyed by process-local monomial ids, so it is rebuilt on unpickling.
+        return Equation, (self.monomials,)
+
     def __str__(self) -> str:
         if len(self.monomials) == 0:
             return "0"
@@ -56,19 +127,73 @@ class Equation:
     def to_smt_preorder(self) -> str:
         if self.is_zero():
             return "0"
-        eq = self.monomials[0].to_smt_preorder()
-        for m in self.monomials[1:]:
-            eq = f"(+ {eq} {m.to_smt_preorder()})"
-        return eq
+        if len(self.monomials) == 1:
+            return self.monomials[0].to_smt_preorder()
+        return f"(+ {' '.join(m.to_smt_preorder() for m in self.monomials)})"
+
+    def compose(self, substitutions: Union[Dict[str, Union["Equation", Number]], PolynomialComposer]) -> "Equation":
+        """
+        Substitutes each variable in `substitutions` by the given equation, algebraically, and returns the expanded equation.
+        e.g., V(S1) composed with {"S1": S1 + D1 + A1} is V(S1 + D1 + A1).
+        `substitutions` can also be a composer built by `Equation.composer`, whose cached expansions are then reused.
+        """
+        if not isinstance(substitutions, PolynomialComposer):
+            substitutions = Equation.composer(substitutions)
+        return Equation.from_polynomial(substitutions.compose(self.to_polynomial()))
+
+    @staticmethod
+    def composer(substitutions: Dict[str, Union["Equation", Number]]) -> PolynomialComposer:
+        return PolynomialComposer({
+            var: value.to_polynomial() if isinstance(value, Equation) else SparsePolynomial.constant(value)
+            for var, value in substitutions.items()
+        })
 
-    def __call__(self, **kwargs) -> str:
-        _eq = str(self)
-        for k, v in kwargs.items():
-            _eq = _eq.replace(k, f"({v})")
-        return _eq
+    def expect(self, moment_provider: MomentProvider) -> "Equation":
+        """
+        Takes the expectation over the random variables of `moment_provider` (e.g., the disturbance), algebraically:
+        each monomial c * m(S) * prod_i D_i**k_i becomes c * E[prod_i D_i**k_i] * m(S).
+        """
+        positions = {
+            symbol_id: i for i, v in enumerate(moment_provider.variables) if (symbol_id := symbols.lookup(v)) is not None
+        }
+        if not positions:
+            return self
+        dimension = len(moment_provider.variables)
+        moments: Dict[Tuple[int, ...], Number] = {}
+        result = SparsePolynomial()
+        for m in self.monomials:
+            exponents, kept = [0] * dimension, []
+            for packed in basis.exponents(m.get_exponent_key()):
+                symbol_id, power = unpack(packed)
+                if symbol_id in positions:
+                    exponents[positions[symbol_id]] = power
+                else:
+                    kept.append(packed)
+            exponents = tuple(exponents)
+            if exponents not in moments:
+                moments[exponents] = moment_provider.moment(exponents)
+            result._accumulate(basis.intern(tuple(kept)), m.coefficient * moments[exponents])
+        return Equation.from_polynomial(result)
+
+    def __call__(self, **kwargs) -> "Equation":
+        return self.compose(kwargs)
+
+    def to_polynomial(self) -> SparsePolynomial:
+        polynomial = SparsePolynomial()
+        for m in self.monomials:
+            polynomial._accumulate(m.get_exponent_key(), m.coefficient)
+        return polynomial
+
+    @classmethod
+    def from_polynomial(cls, polynomial: SparsePolynomial) -> "Equation":
+        return cls(monomials=PolynomialParser.polynomial_to_monomials(polynomial))
 
     @classmethod
     def extract_equation_from_string(cls, equation: str) -> "Equation":
+        return parse_cache.get_or_parse(("equation", cls, PolynomialParser.context()), equation, cls._parse_equation)
+
+    @classmethod
+    def _parse_equation(cls, equation: str) -> "Equation":
         monomials = PolynomialParser.extraxt_monomials_from_string(equation)
         monomials = [m for m in monomials if m.coefficient != 0]
         return cls(monomials=monomials)
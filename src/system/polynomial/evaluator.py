@@ -0,0 +1,84 @@
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from . import logger
+from .equation import Equation
+from .symbols import basis
+
+
+class PolynomialEvaluator:
+    """
+    Compiles a group of equations over the same variables into a numeric evaluator.
+    All the equations are expanded over one shared monomial basis: `exponents` (M x d) holds the powers of the d variables
+    in each of the M basis monomials, and `coefficients` (M x K) the coefficient of each monomial in each of the K
+    equations. For a batch of N points (N x d), the basis is computed once (N x M), and all the K values are obtained
+    with a single matrix multiplication.
+    Symbols that are not variables (e.g., the template coefficients) must be given a value in `constants`, for instance
+    the model returned by the solver.
+    """
+
+    def __init__(self, equations: Sequence[Equation], variables: Sequence[str], constants: Optional[Mapping[str, float]] = None):
+        self.variables = list(variables)
+        self.names = [str(k) for k in range(len(equations))]
+        constants = constants or {}
+        positions = {v: i for i, v in enumerate(self.variables)}
+
+        rows: Dict[tuple, int] = {}
+        entries = []
+        for k, equation in enumerate(equations):
+            for monomial in equation.monomials:
+                powers = [0] * len(self.variables)
+                value = float(monomial.coefficient)
+                for v, p in basis.decode(monomial.get_exponent_key()):
+                    if v in positions:
+                        powers[positions[v]] = p
+                    elif v in constants:
+                        value *= float(constants[v]) ** p
+                    else:
+                        logger.error(f"Symbol '{v}' is neither a variable nor a given constant.")
+                        raise ValueError(f"Symbol '{v}' is neither a variable nor a given constant.")
+                entries.append((rows.setdefault(tuple(powers), len(rows)), k, value))
+
+        self.exponents = np.zeros((len(rows), len(self.variables)), dtype=np.int64)
+        for powers, row in rows.items():
+            self.exponents[row] = powers
+        self.coefficients = np.zeros((len(rows), len(equations)), dtype=np.float64)
+        for row, k, value in entries:
+            self.coefficients[row, k] += value
+        self.maximal_degree = int(self.exponents.max(initial=0))
+
+    @classmethod
+    def from_dict(cls, equations: Mapping[str, Equation], variables: Sequence[str], constants: Optional[Mapping[str, float]] = None) -> "PolynomialEvaluator":
+        """
+        Compiles named equations (e.g., the next-state map {"S1": ..., "S2": ...}); the output columns follow `names`.
+        """
+        evaluator = cls(list(equations.values()), variables, constants)
+        evaluator.names = list(equations.keys())
+        return evaluator
+
+    def monomial_basis(self, points: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the M basis monomials at N points: returns an (N x M) matrix.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        # powers[n, j, p] = points[n, j] ** p
+        powers = np.power(points[:, :, None], np.arange(self.maximal_degree + 1))
+        phi = np.ones((points.shape[0], self.exponents.shape[0]), dtype=np.float64)
+        for j in range(self.exponents.shape[1]):
+            phi *= powers[:, j, self.exponents[:, j]]
+        return phi
+
+    def __call__(self, points: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """
+        Evaluates the equations at a batch of points (N x d), returning an (N x K) matrix; a single point (d,) gives (K,).
+        """
+        points = np.asarray(points, dtype=np.float64)
+        single = points.ndim == 1
+        points = np.atleast_2d(points)
+        if points.shape[1] != len(self.variables):
+            raise ValueError(f"Expected points of dimension {len(self.variables)} ({self.variables}), got {points.shape[1]}.")
+        values = np.empty((points.shape[0], self.coefficients.shape[1]), dtype=np.float64)
+        for start in range(0, points.shape[0], chunk_size):
+            values[start:start + chunk_size] = self.monomial_basis(points[start:start + chunk_size]) @ self.coefficients
+        return values[0] if single else values
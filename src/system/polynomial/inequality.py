@@ -1,4 +1,3 @@
-from dataclasses import dataclass
 from enum import Enum
 
 from . import logger
@@ -74,30 +73,51 @@ class EquationConditionType(Enum):
         return condition
 
 
-@dataclass
 class Inequality:
-    left_equation: Equation
-    inequality_type: EquationConditionType
-    right_equation: Equation
-
-    __slots__ = ["left_equation", "inequality_type", "right_equation"]
-
-    def __post_init__(self):
-        if self.inequality_type not in EquationConditionType:
-            raise ValueError(f"Invalid inequality type: {self.inequality_type}")
-
-        if self.inequality_type not in [EquationConditionType.LESS_THAN_OR_EQUAL, EquationConditionType.GREATER_THAN_OR_EQUAL]:
-            logger.warning(f"You may use '>=' or '<=' for more efficiency. Currently, we are relaxing the condition be default.")
-            self.inequality_type = EquationConditionType.relax_condition(self.inequality_type)
-        self._normalize()
-
-    def _normalize(self):
-        if self.inequality_type in [EquationConditionType.LESS_THAN, EquationConditionType.LESS_THAN_OR_EQUAL]:
-            self.left_equation, self.right_equation = self.right_equation, self.left_equation
-            self.inequality_type = EquationConditionType.mirror_condition(self.inequality_type)
-        if not self.right_equation.is_zero():
-            self.left_equation = self.left_equation.sub(self.right_equation)
-            self.right_equation = Equation.extract_equation_from_string("0")
+    """
+    An inequality between two equations. It is normalised lazily (on first use) into `left_equation >= 0`: strict
+    comparators are relaxed, `<=` is mirrored, and the right-hand side is moved to the left.
+    Equality and hashing are structural (on the normalised comparator and the canonical form of the left-hand side) and cached.
+    """
+    __slots__ = ["_left", "_type", "_right", "_normalized", "_hash"]
+
+    _relaxation_warned = False
+
+    def __init__(self, left_equation: Equation, inequality_type: EquationConditionType, right_equation: Equation):
+        if inequality_type not in EquationConditionType:
+            raise ValueError(f"Invalid inequality type: {inequality_type}")
+        self._left, self._type, self._right = left_equation, inequality_type, right_equation
+        self._normalized = None
+        self._hash = None
+
+    def _normalize(self) -> tuple[Equation, EquationConditionType]:
+        if self._normalized is not None:
+            return self._normalized
+        left, inequality_type, right = self._left, self._type, self._right
+        if inequality_type not in [EquationConditionType.LESS_THAN_OR_EQUAL, EquationConditionType.GREATER_THAN_OR_EQUAL]:
+            if not Inequality._relaxation_warned:
+                logger.warning(f"You may use '>=' or '<=' for more efficiency. Currently, we are relaxing the condition be default.")
+                Inequality._relaxation_warned = True
+            inequality_type = EquationConditionType.relax_condition(inequality_type)
+        if inequality_type in [EquationConditionType.LESS_THAN, EquationConditionType.LESS_THAN_OR_EQUAL]:
+            left, right = right, left
+            inequality_type = EquationConditionType.mirror_condition(inequality_type)
+        if not right.is_zero():
+            left = left.sub(right)
+        self._normalized = (left, inequality_type)
+        return self._normalized
+
+    @property
+    def left_equation(self) -> Equation:
+        return self._normalize()[0]
+
+    @property
+    def inequality_type(self) -> EquationConditionType:
+        return self._normalize()[1]
+
+    @property
+    def right_equation(self) -> Equation:
+        return _zero
 
     def neggate(self):
         return Inequality(
@@ -112,10 +132,21 @@ class Inequality:
     def __eq__(self, other):
         if not isinstance(other, Inequality):
             return False
-        return str(self) == str(other)
+        if self is other:
+            return True
+        return hash(self) == hash(other) and self._normalize() == other._normalize()
 
     def __hash__(self):
-        return hash(str(self))
+        if self._hash is None:
+            self._hash = hash(self._normalize())
+        return self._hash
+
+    def __reduce__(self):
+        # The cached hash depends on process-local monomial ids, so it is recomputed after unpickling.
+        return Inequality, (self._left, self._type, self._right)
+
+    def __repr__(self) -> str:
+        return f"Inequality({self.to_detailed_string()})"
 
     def to_detailed_string(self) -> str:
         return f"{self.left_equation} {self.inequality_type.value} {self.right_equation}"
@@ -132,3 +163,4 @@ class Inequality:
         return f"{lhs} {self.inequality_type.value} {rhs}"
 
 
+_zero = Equation()
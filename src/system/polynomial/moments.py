@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from numbers import Number
+from typing import List, Tuple
+
+
+class MomentProvider(ABC):
+    """
+    The moments of a random vector (e.g., the disturbance), used to take expectations algebraically.
+    """
+
+    @property
+    @abstractmethod
+    def variables(self) -> List[str]:
+        """
+        The names of the random variables, e.g., ["D1", "D2"].
+        """
+        pass
+
+    @abstractmethod
+    def moment(self, exponents: Tuple[int, ...]) -> Number:
+        """
+        The (possibly mixed) moment E[prod_i variables[i]**exponents[i]].
+        """
+        pass
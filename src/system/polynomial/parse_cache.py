@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from . import logger
+
+
+__valid_eviction_policies__ = ["lru", "fifo"]
+
+
+class ParseCache:
+    """
+    A bounded memo of parsed strings (polynomials, space predicates, ...), keyed by the kind of the parse and the
+    whitespace-normalised input. Only immutable results (e.g., `Equation`s or tuples of them) should be stored, as they
+    are shared between all the callers.
+    `maxsize=None` makes the cache unbounded and `maxsize=0` disables it; `eviction` is either "lru" or "fifo".
+    """
+
+    def __init__(self, maxsize: Optional[int] = 4096, eviction: str = "lru"):
+        self._entries: OrderedDict = OrderedDict()
+        self.configure(maxsize=maxsize, eviction=eviction)
+
+    def configure(self, maxsize: Optional[int] = 4096, eviction: str = "lru") -> None:
+        if eviction not in __valid_eviction_policies__:
+            logger.error(f"Invalid eviction policy ({eviction}). Choose one of {__valid_eviction_policies__}.")
+            raise ValueError(f"Invalid eviction policy ({eviction}). Choose one of {__valid_eviction_policies__}.")
+        if maxsize is not None and maxsize < 0:
+            raise ValueError(f"The cache size must be non-negative, got {maxsize}.")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self._shrink()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def normalise(string: str) -> str:
+        return "".join(str(string).split())
+
+    def get_or_parse(self, kind: Hashable, string: str, parse: Callable[[str], object]):
+        key = (kind, ParseCache.normalise(string))
+        if key in self._entries:
+            self.hits += 1
+            if self.eviction == "lru":
+                self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        result = parse(string)
+        if self.maxsize != 0:
+            self._entries[key] = result
+            self._shrink()
+        return result
+
+    def _shrink(self) -> None:
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = 100 * self.hits / total if total else 0
+        return (f"{self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), {self.evictions} evictions, "
+                f"{len(self._entries)}/{self.maxsize if self.maxsize is not None else 'inf'} entries ({self.eviction})")
+
+
+parse_cache = ParseCache()
@@ -1,52 +1,71 @@
+import re
 from dataclasses import dataclass
 from typing import Sequence
 
-import sympy as sp
-from sympy import expand
-from sympy.parsing.sympy_parser import parse_expr
-
 from . import logger
+from .coefficients import Coefficients
+from .sparse import SparsePolynomial, ExponentKey
+from .symbols import MonomialBasis, basis
 
 
 _to_power = lambda v, p: f"{v}**{p}" if p != 1 else str(v)
+_smt_factors: dict[ExponentKey, str] = {}
 # __max_float_digits__ = 20
 
 
 def _smt_preorder_var_pow_helper(_var, _pow) -> str:
     """
-    Converts {var}^{pow} to a preorder multiplication.
+    Converts {var}^{pow} to the operands of an n-ary preorder multiplication, e.g., "S1 S1 S1" for S1^3.
     """
     if _pow == 0:
         return "1"
-    if _pow == 1:
-        return _var
-    if _pow == 2:
-        return f"(* {_var} {_var})"
-    return f"(* {_smt_preorder_var_pow_helper(_var, _pow // 2)} {_smt_preorder_var_pow_helper(_var, (_pow + 1) // 2)})"
+    return " ".join([_var] * _pow)
 
-@dataclass
+@dataclass(frozen=True)
 class Monomial:
+    """
+    An immutable monomial. The variables and powers are interned into the problem-wide `MonomialBasis` once, so the
+    exponent key is a small integer and monomials can be freely shared between equations. `variable_generators` and `power`
+    are decoded (in the symbol-table order) only when they are accessed.
+    """
     coefficient: float
     variable_generators: Sequence[str]
     power: Sequence[float]
 
-    __slots__ = ["coefficient", "variable_generators", "power"]
+    __slots__ = ["coefficient", "variable_generators", "power", "_key"]
 
     def __post_init__(self):
         if len(self.variable_generators) != len(self.power):
             logger.error(f"The number of variables and powers must match: {self.variable_generators} vs. {self.power}")
             raise ValueError(f"The number of variables and powers must match: {self.variable_generators} vs. {self.power}")
         if self.coefficient == 0:
-            self.variable_generators, self.power = [], []
-            self.coefficient = 0
-            return
+            object.__setattr__(self, "coefficient", 0)
+            key = MonomialBasis.CONSTANT
+        else:
+            key = basis.from_names(zip(self.variable_generators, self.power))
+        object.__setattr__(self, "_key", key)
+        object.__delattr__(self, "variable_generators")
+        object.__delattr__(self, "power")
 
-        filtered = [(v, p) for v, p in zip(self.variable_generators, self.power) if p != 0]
-        if not filtered:
-            self.variable_generators, self.power = [], []
-            return
-        self.variable_generators, self.power = zip(*filtered)
-        self.variable_generators, self.power = zip(*sorted(zip(self.variable_generators, self.power), key=lambda x: x[0]))
+    def __getattr__(self, name):
+        if name not in ("variable_generators", "power"):
+            raise AttributeError(f"'Monomial' object has no attribute '{name}'")
+        decoded = basis.decode(self._key)
+        object.__setattr__(self, "variable_generators", tuple(v for v, _ in decoded))
+        object.__setattr__(self, "power", tuple(p for _, p in decoded))
+        return object.__getattribute__(self, name)
+
+    @classmethod
+    def from_exponent_key(cls, coefficient: float, key: ExponentKey) -> "Monomial":
+        """
+        Builds a monomial from an interned exponent key, skipping the validation.
+        """
+        monomial = object.__new__(cls)
+        if coefficient == 0:
+            coefficient, key = 0, MonomialBasis.CONSTANT
+        object.__setattr__(monomial, "coefficient", coefficient)
+        object.__setattr__(monomial, "_key", key)
+        return monomial
 
     def __eq__(self, other):
         """
@@ -54,12 +73,7 @@ class Monomial:
         """
         if not isinstance(other, Monomial):
             return False
-        if len(self.variable_generators) != len(other.variable_generators):
-            return False
-        for (_sv, _sp), (_ov, _op) in zip(zip(self.variable_generators, self.power), zip(other.variable_generators, other.power)):
-            if _sv != _ov or _sp != _op:
-                return False
-        return True
+        return self._key == other._key
 
     def add(self, other):
         """
@@ -67,80 +81,223 @@ class Monomial:
         """
         if not self == other:
             return None
-        return Monomial(
-            coefficient=self.coefficient + other.coefficient,
-            variable_generators=self.variable_generators,
-            power=self.power
-        )
+        return Monomial.from_exponent_key(self.coefficient + other.coefficient, self._key)
 
     def negate(self):
-        return Monomial(
-            coefficient=-self.coefficient,
-            variable_generators=self.variable_generators,
-            power=self.power
-        )
+        return Monomial.from_exponent_key(-self.coefficient, self._key)
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __reduce__(self):
+        # Exponent keys are only meaningful within a process, so pickles carry the variable names.
+        return _monomial_from_names, (self.coefficient, basis.decode(self._key))
+
+    def __deepcopy__(self, memo):
+        return self
 
     def is_zero(self) -> bool:
         return self.coefficient == 0
 
     def is_numeric(self) -> bool:
-        return len(self.variable_generators) == 0
+        return self._key == MonomialBasis.CONSTANT
 
     def to_smt_preorder(self) -> str:
         if self.coefficient == 0:
             return "0"
-        coefficient_var_pow = str(self.coefficient)
+        coefficient_var_pow = Coefficients.to_smt(self.coefficient)
         # coefficient_var_pow = str(round(self.coefficient, __max_float_digits__))
-        if len(self.variable_generators) == 0:
+        if self._key == MonomialBasis.CONSTANT:
             return coefficient_var_pow
-        for v, p in zip(self.variable_generators, self.power):
-            coefficient_var_pow = f"(* {coefficient_var_pow} {_smt_preorder_var_pow_helper(v, p)})"
-        return coefficient_var_pow
+        factors = _smt_factors.get(self._key)
+        if factors is None:
+            factors = " ".join(_smt_preorder_var_pow_helper(v, p) for v, p in basis.decode(self._key))
+            _smt_factors[self._key] = factors
+        return f"(* {coefficient_var_pow} {factors})"
+
+    def get_exponent_key(self) -> ExponentKey:
+        return self._key
 
     def get_symbolic_constant(self) -> set:
-        return {v for v in self.variable_generators if "_" in v}
+        return {v for v, _ in basis.decode(self._key) if "_" in v}
 
     def __str__(self) -> str:
         if self.coefficient == 0:
             return "0"
         coefficient_var_pow = str(self.coefficient)
         # coefficient_var_pow = str(round(self.coefficient, __max_float_digits__))
-        if len(self.variable_generators) == 0:
+        if self._key == MonomialBasis.CONSTANT:
             return coefficient_var_pow
         if self.coefficient == 1:
-            return f"{' * '.join([_to_power(v, p) for v, p in zip(self.variable_generators, self.power) if p != 0])}"
-        return f"{coefficient_var_pow} * {' * '.join([_to_power(v, p) for v, p in zip(self.variable_generators, self.power) if p != 0])}" # .replace(" * 1", "")
+            return f"{' * '.join([_to_power(v, p) for v, p in basis.decode(self._key)])}"
+        return f"{coefficient_var_pow} * {' * '.join([_to_power(v, p) for v, p in basis.decode(self._key)])}" # .replace(" * 1", "")
+
+
+def _monomial_from_names(coefficient: float, variables) -> Monomial:
+    return Monomial.from_exponent_key(coefficient, basis.from_names(variables))
+
+
+
+
+class PolynomialSyntaxError(ValueError):
+    pass
+
+
+_token_pattern = re.compile(r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<op>\*\*|[-+*/^()]))")
+
+
+class _NativePolynomialParser:
+    """
+    A recursive-descent parser for the polynomial strings of the input files, building a `SparsePolynomial` directly.
+    Grammar: expr := term (('+'|'-') term)*, term := unary (('*'|'/') unary)*, unary := ('+'|'-') unary | power,
+    power := atom (('**'|'^') unary)?, atom := NUMBER | NAME | '(' expr ')'.
+    """
 
+    def __init__(self, polynomial: str):
+        self.text = polynomial
+        self.tokens = self._tokenize(polynomial)
+        self.position = 0
 
+    @staticmethod
+    def _tokenize(polynomial: str) -> list[tuple[str, str]]:
+        tokens = []
+        position = 0
+        polynomial = polynomial.rstrip()
+        while position < len(polynomial):
+            match = _token_pattern.match(polynomial, position)
+            if match is None or match.end() == position:
+                raise PolynomialSyntaxError(f"Unexpected character at {position} in '{polynomial}'")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            position = match.end()
+        return tokens
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise PolynomialSyntaxError(f"Unexpected end of the expression in '{self.text}'")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> SparsePolynomial:
+        if not self.tokens:
+            raise PolynomialSyntaxError("Empty expression.")
+        result = self._expr()
+        if self.position != len(self.tokens):
+            raise PolynomialSyntaxError(f"Unexpected token '{self._peek()}' in '{self.text}'")
+        return result
+
+    def _expr(self) -> SparsePolynomial:
+        result = self._term()
+        while self._peek() in ("+", "-"):
+            if self._next()[1] == "+":
+                result = result + self._term()
+            else:
+                result = result - self._term()
+        return result
+
+    def _term(self) -> SparsePolynomial:
+        result = self._unary()
+        while self._peek() in ("*", "/"):
+            if self._next()[1] == "*":
+                result = result * self._unary()
+            else:
+                result = result / self._unary()
+        return result
+
+    def _unary(self) -> SparsePolynomial:
+        if self._peek() == "-":
+            self._next()
+            return -self._unary()
+        if self._peek() == "+":
+            self._next()
+            return self._unary()
+        return self._power()
+
+    def _power(self) -> SparsePolynomial:
+        base = self._atom()
+        if self._peek() in ("**", "^"):
+            self._next()
+            exponent = self._unary()
+            if not exponent.is_constant():
+                raise PolynomialSyntaxError(f"Exponents must be numeric in '{self.text}'")
+            value = exponent.constant_value()
+            if value < 0 or int(value) != value:
+                raise PolynomialSyntaxError(f"Exponents must be non-negative integers in '{self.text}', got {value}")
+            return base ** int(value)
+        return base
+
+    def _atom(self) -> SparsePolynomial:
+        kind, value = self._next()
+        if kind == "number":
+            return SparsePolynomial.constant(Coefficients.from_literal(value))
+        if kind == "name":
+            if self._peek() == "(":
+                raise PolynomialSyntaxError(f"Function calls are not supported natively: '{value}(' in '{self.text}'")
+            return SparsePolynomial.variable(value)
+        if value == "(":
+            result = self._expr()
+            if self._next()[1] != ")":
+                raise PolynomialSyntaxError(f"Unbalanced parentheses in '{self.text}'")
+            return result
+        raise PolynomialSyntaxError(f"Unexpected token '{value}' in '{self.text}'")
+
+
+def _sympy_to_number(value):
+    if value.is_Integer:
+        return int(value)
+    if value.is_Rational and Coefficients.is_exact():
+        return Coefficients.from_literal(f"{value.p}/{value.q}")
+    return Coefficients.from_value(float(value))
 
 
 class PolynomialParser:
+    """
+    Parses polynomial strings into monomials. The native parser is used; SymPy is only imported (lazily) as a fallback
+    for user-written strings the native grammar does not cover.
+    """
 
     @staticmethod
     def extraxt_monomials_from_string(polynomial: str) -> list[Monomial]:
-        expanded = expand(polynomial)
-        expr = parse_expr(str(expanded))
-        if expr.is_number:
-            return [Monomial(coefficient=expr, variable_generators=[], power=[])]
-        sympy_polynomial = sp.Poly(expr)
-        return PolynomialParser._convert_sympy_polynomial_to_monomials(sympy_polynomial)
+        return PolynomialParser.polynomial_to_monomials(PolynomialParser.parse(polynomial))
 
+    @staticmethod
+    def parse(polynomial: str) -> SparsePolynomial:
+        try:
+            return _NativePolynomialParser(str(polynomial)).parse()
+        except PolynomialSyntaxError as e:
+            logger.info(f"Native polynomial parser could not handle '{polynomial}' ({e}); falling back to SymPy.")
+            return PolynomialParser._parse_with_sympy(polynomial)
+
+    @staticmethod
+    def context() -> tuple:
+        """
+        The settings the result of a parse depends on; part of the parse-cache keys.
+        """
+        return Coefficients.mode, Coefficients.max_denominator
 
+    @staticmethod
+    def polynomial_to_monomials(polynomial: SparsePolynomial) -> list[Monomial]:
+        return [Monomial.from_exponent_key(coefficient, key) for key, coefficient in polynomial.terms.items()]
 
     @staticmethod
-    def _convert_sympy_polynomial_to_monomials(sympy_polynomial: sp.Poly) -> list[Monomial]:
-        variable_generators = [
-            str(var)
-            for var in list(sympy_polynomial.gens)
-        ]
-        sympy_monomials = sympy_polynomial.monoms()
-        sympy_coefficients = sympy_polynomial.coeffs()
-
-        return [
-            Monomial(
-                coefficient=coefficient,
-                variable_generators=variable_generators,
-                power=monomial
-            )
-            for coefficient, monomial in zip(sympy_coefficients, sympy_monomials)
-        ]
+    def _parse_with_sympy(polynomial: str) -> SparsePolynomial:
+        try:
+            import sympy as sp
+            from sympy.parsing.sympy_parser import parse_expr
+        except ImportError as e:
+            logger.error(f"SymPy is required to parse '{polynomial}', but it is not installed.")
+            raise ValueError(f"SymPy is required to parse '{polynomial}', but it is not installed.") from e
+
+        expr = parse_expr(str(sp.expand(polynomial)))
+        if expr.is_number:
+            return SparsePolynomial.constant(_sympy_to_number(expr))
+        sympy_polynomial = sp.Poly(expr)
+        variable_generators = [str(var) for var in sympy_polynomial.gens]
+        result = SparsePolynomial()
+        for monomial, coefficient in zip(sympy_polynomial.monoms(), sympy_polynomial.coeffs()):
+            result._accumulate(basis.from_names(zip(variable_generators, monomial)), _sympy_to_number(coefficient))
+        return result
@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from numbers import Number
+from typing import Dict, Tuple
+
+from . import logger
+from .symbols import MonomialBasis, basis, pack, symbols, unpack
+
+
+ExponentKey = int
+"""
+A monomial is identified by its index in the problem-wide `MonomialBasis`; the constant monomial is `MonomialBasis.CONSTANT`.
+"""
+
+
+@dataclass
+class SparsePolynomial:
+    """
+    A sparse multivariate polynomial, stored as a map from (interned) monomial indices to non-zero coefficients.
+    This is the arithmetic kernel behind `Monomial`/`Equation`; it replaces the SymPy round-trip on the hot paths.
+    """
+    terms: Dict[ExponentKey, Number] = field(default_factory=dict)
+
+    @classmethod
+    def constant(cls, value: Number) -> "SparsePolynomial":
+        if value == 0:
+            return cls()
+        return cls({MonomialBasis.CONSTANT: value})
+
+    @classmethod
+    def variable(cls, name: str, power: int = 1) -> "SparsePolynomial":
+        if power == 0:
+            return cls.constant(1)
+        return cls({basis.variable(name, power): 1})
+
+    def copy(self) -> "SparsePolynomial":
+        return SparsePolynomial(dict(self.terms))
+
+    def is_zero(self) -> bool:
+        return not self.terms
+
+    def is_constant(self) -> bool:
+        return not self.terms or (len(self.terms) == 1 and MonomialBasis.CONSTANT in self.terms)
+
+    def constant_value(self) -> Number:
+        return self.terms.get(MonomialBasis.CONSTANT, 0)
+
+    def degree(self) -> int:
+        return max((basis.degree(key) for key in self.terms), default=0)
+
+    def _accumulate(self, key: ExponentKey, coefficient: Number) -> None:
+        value = self.terms.get(key, 0) + coefficient
+        if value == 0:
+            self.terms.pop(key, None)
+        else:
+            self.terms[key] = value
+
+    def __add__(self, other) -> "SparsePolynomial":
+        other = _as_polynomial(other)
+        result = self.copy()
+        for key, coefficient in other.terms.items():
+            result._accumulate(key, coefficient)
+        return result
+
+    __radd__ = __add__
+
+    def __neg__(self) -> "SparsePolynomial":
+        return SparsePolynomial({key: -coefficient for key, coefficient in self.terms.items()})
+
+    def __sub__(self, other) -> "SparsePolynomial":
+        other = _as_polynomial(other)
+        result = self.copy()
+        for key, coefficient in other.terms.items():
+            result._accumulate(key, -coefficient)
+        return result
+
+    def __rsub__(self, other) -> "SparsePolynomial":
+        return _as_polynomial(other) - self
+
+    def __mul__(self, other) -> "SparsePolynomial":
+        other = _as_polynomial(other)
+        result = SparsePolynomial()
+        for k1, c1 in self.terms.items():
+            for k2, c2 in other.terms.items():
+                result._accumulate(basis.product(k1, k2), c1 * c2)
+        return result
+
+    __rmul__ = __mul__
+
+    def scale(self, factor: Number) -> "SparsePolynomial":
+        if factor == 0:
+            return SparsePolynomial()
+        return SparsePolynomial({key: coefficient * factor for key, coefficient in self.terms.items()})
+
+    def __truediv__(self, other) -> "SparsePolynomial":
+        other = _as_polynomial(other)
+        if not other.is_constant() or other.is_zero():
+            logger.error(f"Polynomials can only be divided by non-zero constants, got {other}.")
+            raise ZeroDivisionError(f"Polynomials can only be divided by non-zero constants, got {other}.")
+        divisor = other.constant_value()
+        return SparsePolynomial({key: coefficient / divisor for key, coefficient in self.terms.items()})
+
+    def __pow__(self, exponent: int) -> "SparsePolynomial":
+        if not isinstance(exponent, int) or exponent < 0:
+            raise ValueError(f"Only non-negative integer powers are supported, got {exponent}.")
+        if exponent == 0:
+            return SparsePolynomial.constant(1)
+        if len(self.terms) == 1:
+            (key, coefficient), = self.terms.items()
+            return SparsePolynomial({basis.power(key, exponent): coefficient ** exponent})
+        result = SparsePolynomial.constant(1)
+        base = self
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
+        return result
+
+    def compose(self, substitutions: Dict[str, "SparsePolynomial"]) -> "SparsePolynomial":
+        """
+        Substitutes the variables in `substitutions` by the given polynomials and expands the result.
+        Variables are matched by their exact name, so substituting `S1` never touches `S10`.
+        To compose several polynomials with the same substitutions, build one `PolynomialComposer` and reuse it.
+        """
+        return PolynomialComposer(substitutions).compose(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Number):
+            other = SparsePolynomial.constant(other)
+        if not isinstance(other, SparsePolynomial):
+            return False
+        return self.terms == other.terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __str__(self) -> str:
+        if not self.terms:
+            return "0"
+        return " + ".join(
+            f"({coefficient}{''.join(f' * {v}**{p}' if p != 1 else f' * {v}' for v, p in basis.decode(key))})"
+            for key, coefficient in self.terms.items()
+        )
+
+    def __reduce__(self):
+        # Monomial indices are only meaningful within a process, so pickles carry the variable names.
+        return _polynomial_from_names, ([(basis.decode(key), coefficient) for key, coefficient in self.terms.items()],)
+
+
+class PolynomialComposer:
+    """
+    A reusable substitution {variable: polynomial}, e.g., the next-state map of a dynamics branch under a policy.
+    The expansion of every monomial over the substituted variables is computed once (from the expansion of the monomial
+    with one power less) and cached, so composing a polynomial is a weighted sum of cached expansions, shifted by the
+    monomial of its remaining variables.
+    """
+    __slots__ = ["substitutions", "_splits", "_expansions"]
+
+    def __init__(self, substitutions: Dict[str, SparsePolynomial]):
+        self.substitutions: Dict[int, SparsePolynomial] = {
+            symbol_id: _as_polynomial(p) for v, p in substitutions.items() if (symbol_id := symbols.lookup(v)) is not None
+        }
+        self._splits: Dict[ExponentKey, Tuple[ExponentKey, ExponentKey]] = {}
+        self._expansions: Dict[ExponentKey, SparsePolynomial] = {MonomialBasis.CONSTANT: SparsePolynomial.constant(1)}
+
+    def _split(self, key: ExponentKey) -> Tuple[ExponentKey, ExponentKey]:
+        """
+        Splits a monomial into its (substituted, kept) factors.
+        """
+        split = self._splits.get(key)
+        if split is None:
+            substituted, kept = [], []
+            for packed in basis.exponents(key):
+                (substituted if unpack(packed)[0] in self.substitutions else kept).append(packed)
+            split = basis.intern(tuple(substituted)), basis.intern(tuple(kept))
+            self._splits[key] = split
+        return split
+
+    def expansion(self, key: ExponentKey) -> SparsePolynomial:
+        """
+        The expansion of a monomial over the substituted variables only; shared, so it must not be modified.
+        """
+        expansion = self._expansions.get(key)
+        if expansion is None:
+            *rest, last = basis.exponents(key)
+            symbol_id, power = unpack(last)
+            if power > 1:
+                rest.append(pack(symbol_id, power - 1))
+            expansion = self.expansion(basis.intern(tuple(rest))) * self.substitutions[symbol_id]
+            self._expansions[key] = expansion
+        return expansion
+
+    def compose(self, polynomial: SparsePolynomial) -> SparsePolynomial:
+        if not self.substitutions:
+            return polynomial.copy()
+        result = SparsePolynomial()
+        for key, coefficient in polynomial.terms.items():
+            substituted, kept = self._split(key)
+            for k, c in self.expansion(substituted).terms.items():
+                result._accumulate(basis.product(kept, k), coefficient * c)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._expansions)
+
+
+def _polynomial_from_names(terms) -> SparsePolynomial:
+    result = SparsePolynomial()
+    for variables, coefficient in terms:
+        result._accumulate(basis.from_names(variables), coefficient)
+    return result
+
+
+def _as_polynomial(value) -> SparsePolynomial:
+    if isinstance(value, SparsePolynomial):
+        return value
+    if isinstance(value, Number):
+        return SparsePolynomial.constant(value)
+    raise TypeError(f"Expected SparsePolynomial or a number, got {type(value)}")
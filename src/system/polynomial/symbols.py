@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import logger
+
+
+_POWER_BITS = 16
+_POWER_MASK = (1 << _POWER_BITS) - 1
+
+PackedExponents = Tuple[int, ...]
+"""
+The exponents of a monomial, packed as one integer per variable: (symbol_id << _POWER_BITS) | power, sorted by symbol id.
+Variables with a zero power never appear, so the constant monomial is the empty tuple.
+"""
+
+
+def pack(symbol_id: int, power: int) -> int:
+    if not 0 < power <= _POWER_MASK:
+        logger.error(f"Powers must be in (0, {_POWER_MASK}], got {power}.")
+        raise ValueError(f"Powers must be in (0, {_POWER_MASK}], got {power}.")
+    return (symbol_id << _POWER_BITS) | power
+
+
+def unpack(packed: int) -> Tuple[int, int]:
+    return packed >> _POWER_BITS, packed & _POWER_MASK
+
+
+class SymbolTable:
+    """
+    Problem-wide interning of variable names: each name is mapped to a small integer id, in the order of first use.
+    """
+    __slots__ = ["_ids", "_names"]
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            symbol_id = len(self._names)
+            self._ids[name] = symbol_id
+            self._names.append(name)
+        return symbol_id
+
+    def lookup(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name(self, symbol_id: int) -> str:
+        return self._names[symbol_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class MonomialBasis:
+    """
+    Problem-wide interning of monomials (without coefficients): each distinct packed exponent tuple gets a small integer
+    index, so polynomials are maps from integers to coefficients. Products are memoised on pairs of indices, and the
+    variable names are only decoded (once per monomial) when a monomial is printed.
+    """
+    CONSTANT = 0
+
+    __slots__ = ["symbols", "_exponents", "_ids", "_degrees", "_decoded", "_products"]
+
+    def __init__(self, symbols: SymbolTable):
+        self.symbols = symbols
+        self._exponents: List[PackedExponents] = [()]
+        self._ids: Dict[PackedExponents, int] = {(): MonomialBasis.CONSTANT}
+        self._degrees: List[int] = [0]
+        self._decoded: List[Optional[Tuple[Tuple[str, int], ...]]] = [()]
+        self._products: Dict[Tuple[int, int], int] = {}
+
+    def intern(self, exponents: PackedExponents) -> int:
+        index = self._ids.get(exponents)
+        if index is None:
+            index = len(self._exponents)
+            self._ids[exponents] = index
+            self._exponents.append(exponents)
+            self._degrees.append(sum(e & _POWER_MASK for e in exponents))
+            self._decoded.append(None)
+        return index
+
+    def from_names(self, variables: Iterable[Tuple[str, int]]) -> int:
+        """
+        Interns the monomial prod(variable**power); repeated variables are multiplied and zero powers are dropped.
+        """
+        powers: Dict[int, int] = {}
+        for variable, power in variables:
+            if power != 0:
+                symbol_id = self.symbols.intern(variable)
+                powers[symbol_id] = powers.get(symbol_id, 0) + int(power)
+        return self.intern(tuple(pack(symbol_id, power) for symbol_id, power in sorted(powers.items()) if power != 0))
+
+    def variable(self, name: str, power: int = 1) -> int:
+        if power == 0:
+            return MonomialBasis.CONSTANT
+        return self.intern((pack(self.symbols.intern(name), power),))
+
+    def exponents(self, index: int) -> PackedExponents:
+        return self._exponents[index]
+
+    def degree(self, index: int) -> int:
+        return self._degrees[index]
+
+    def decode(self, index: int) -> Tuple[Tuple[str, int], ...]:
+        decoded = self._decoded[index]
+        if decoded is None:
+            decoded = tuple((self.symbols.name(symbol_id), power) for symbol_id, power in map(unpack, self._exponents[index]))
+            self._decoded[index] = decoded
+        return decoded
+
+    def product(self, first: int, second: int) -> int:
+        if first == MonomialBasis.CONSTANT:
+            return second
+        if second == MonomialBasis.CONSTANT:
+            return first
+        pair = (first, second) if first <= second else (second, first)
+        index = self._products.get(pair)
+        if index is None:
+            index = self.intern(_merge_exponents(self._exponents[first], self._exponents[second]))
+            self._products[pair] = index
+        return index
+
+    def power(self, index: int, exponent: int) -> int:
+        if exponent == 0:
+            return MonomialBasis.CONSTANT
+        return self.intern(tuple(pack(symbol_id, power * exponent) for symbol_id, power in map(unpack, self._exponents[index])))
+
+    def __len__(self) -> int:
+        return len(self._exponents)
+
+
+def _merge_exponents(first: PackedExponents, second: PackedExponents) -> PackedExponents:
+    """
+    Multiplies two monomials by merging their (sorted) packed exponents.
+    """
+    merged = []
+    i, j = 0, 0
+    while i < len(first) and j < len(second):
+        s1, s2 = first[i] >> _POWER_BITS, second[j] >> _POWER_BITS
+        if s1 == s2:
+            merged.append(pack(s1, (first[i] & _POWER_MASK) + (second[j] & _POWER_MASK)))
+            i += 1
+            j += 1
+        elif s1 < s2:
+            merged.append(first[i])
+            i += 1
+        else:
+            merged.append(second[j])
+            j += 1
+    merged.extend(first[i:])
+    merged.extend(second[j:])
+    return tuple(merged)
+
+
+symbols = SymbolTable()
+basis = MonomialBasis(symbols)
@@ -0,0 +1,324 @@
+from dataclasses import dataclass, field
+from fractions import Fraction
+from numbers import Number
+from typing import Mapping, Optional
+
+import numpy as np
+
+from .action import PolicyMode, SystemDecomposedControlPolicy
+from .automata.graph import Automata
+from .dynamics import ConditionalDynamics, SystemDynamics
+from .log import logger
+from .polynomial.coefficients import Coefficients
+from .polynomial.equation import Equation
+from .polynomial.evaluator import PolynomialEvaluator
+from .polynomial.inequality import Inequality
+from .polynomial.sparse import PolynomialComposer, SparsePolynomial
+from .polynomial.symbols import MonomialBasis, basis
+from .space import SystemSpace, extract_space_inequalities
+
+
+__valid_rescalings__ = ["none", "scale", "box"]
+
+
+@dataclass
+class StateRescaling:
+    """
+    The affine change of the state variables S_i = center_i + scale_i * S~_i, given by `rescaling` in the synthesis
+    config, so that the templates and the solver work with coefficients of comparable magnitudes:
+        - "none": no rescaling (default);
+        - "scale": S_i is divided by the largest absolute bound of S_i in the system space;
+        - "box": the bounding box of the system space is mapped to [-1, 1]^n (a one-sided bound is only scaled).
+    The bounds are read from the inequalities of the system space that are linear in a single state variable.
+    The rescaled problem keeps the names S1, ..., Sn; the disturbances are not rescaled, as they only enter through the
+    dynamics, so their moments are unchanged.
+    """
+    center: list[Number]
+    scale: list[Number]
+    _to_original: PolynomialComposer = field(init=False, repr=False)
+    _to_scaled: PolynomialComposer = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._to_original = Equation.composer({
+            f"S{i}": Equation.from_polynomial(SparsePolynomial.constant(c) + SparsePolynomial.variable(f"S{i}").scale(s))
+            for i, (c, s) in enumerate(zip(self.center, self.scale), start=1)
+        })
+        self._to_scaled = Equation.composer({
+            f"S{i}": Equation.from_polynomial((SparsePolynomial.variable(f"S{i}") - SparsePolynomial.constant(c)) / s)
+            for i, (c, s) in enumerate(zip(self.center, self.scale), start=1)
+        })
+
+    @classmethod
+    def from_space(cls, mode: str, space: SystemSpace, state_dimension: int) -> Optional["StateRescaling"]:
+        """
+        The rescaling of the state variables, or None if there is nothing to rescale.
+        """
+        if mode not in __valid_rescalings__:
+            raise ValueError(f"Invalid rescaling ({mode}). Choose one of {__valid_rescalings__}.")
+        if mode == "none":
+            return None
+        center, scale = [], []
+        for lower, upper in _bounding_box(space, state_dimension):
+            if mode == "box" and lower is not None and upper is not None and lower < upper:
+                center.append((lower + upper) / 2)
+                scale.append((upper - lower) / 2)
+                continue
+            bound = max((abs(b) for b in (lower, upper) if b is not None), default=0)
+            center.append(0)
+            scale.append(bound if bound != 0 else 1)
+        center = [Coefficients.from_value(c) for c in center]
+        scale = [Coefficients.from_value(s) for s in scale]
+        if all(c == 0 for c in center) and all(s == 1 for s in scale):
+            logger.info("No bounds to rescale the state variables with.")
+            return None
+        return cls(center=center, scale=scale)
+
+    def rescale_equation(self, equation: Equation) -> Equation:
+        """
+        A polynomial in the original state variables, rewritten in the rescaled ones.
+        """
+        return equation.compose(self._to_original)
+
+    def restore_equation(self, equation: Equation) -> Equation:
+        """
+        A polynomial in the rescaled state variables, rewritten in the original ones.
+        """
+        return equation.compose(self._to_scaled)
+
+    def rescale_inequality(self, inequality: Inequality) -> Inequality:
+        # Normalised by the largest coefficient, which keeps the direction of the inequality.
+        polynomial = self.rescale_equation(inequality.left_equation).to_polynomial()
+        largest = max((abs(coefficient) for coefficient in polynomial.terms.values()), default=1)
+        return Inequality(
+            left_equation=Equation.from_polynomial(polynomial / largest),
+            inequality_type=inequality.inequality_type,
+            right_equation=inequality.right_equation,
+        )
+
+    def rescale_space(self, space: SystemSpace) -> SystemSpace:
+        return SystemSpace(space_inequalities=[self.rescale_inequality(inequality) for inequality in space.space_inequalities])
+
+    def rescale_predicate(self, predicate: str) -> str:
+        return " and ".join(
+            f"{polynomial_to_string(self.rescale_inequality(inequality).left_equation.to_polynomial())} >= 0"
+            for inequality in extract_space_inequalities(predicate)
+        )
+
+    def rescale_dynamics(self, system_dynamics: SystemDynamics) -> SystemDynamics:
+        """
+        S~' = (f(center + scale * S~) - center) / scale, with the conditions rewritten as the spaces.
+        """
+        return SystemDynamics(
+            state_dimension=system_dynamics.state_dimension,
+            action_dimension=system_dynamics.action_dimension,
+            disturbance_dimension=system_dynamics.disturbance_dimension,
+            system_transformations=[
+                ConditionalDynamics(
+                    condition=[self.rescale_inequality(inequality) for inequality in dynamics.condition],
+                    dynamics=[
+                        Equation.from_polynomial((self.rescale_equation(transform).to_polynomial() - SparsePolynomial.constant(c)) / s)
+                        for transform, c, s in zip(dynamics.dynamics, self.center, self.scale)
+                    ],
+                )
+                for dynamics in system_dynamics.system_transformations
+            ],
+        )
+
+    def rescale_automata(self, automata: Automata) -> None:
+        automata.lookup_table = {
+            key: self.rescale_predicate(predicate)
+            for key, predicate in automata.lookup_table.items()
+        }
+
+    def rescale_policy(self, decomposed_control_policy: SystemDecomposedControlPolicy) -> None:
+        """
+        Rewrites the provided (verification mode) policies; the synthesized ones are templates in the rescaled variables.
+        """
+        for policy in decomposed_control_policy.policies:
+            if policy.mode == PolicyMode.VERIFICATION:
+                policy.update_control_policy([self.rescale_equation(equation) for equation in policy.transitions])
+
+    def restore_templates(self, model: dict[str, str], templates: Mapping[str, Equation]) -> dict[str, SparsePolynomial]:
+        """
+        Instantiates each template with the model and rewrites it in the original state variables. This is the
+        synthesized certificate (or policy) itself, whatever the template basis and the symmetries are.
+        """
+        try:
+            values = _model_values(model)
+        except ValueError as e:
+            logger.warning(f"The templates cannot be instantiated with the model ({e}).")
+            return {}
+        return {
+            name: self.restore_equation(Equation.from_polynomial(_instantiate(template, values))).to_polynomial()
+            for name, template in templates.items()
+        }
+
+    def restore_model(self, model: dict[str, str], templates: Mapping[str, Equation], samples: int = 16) -> Optional[dict[str, str]]:
+        """
+        Maps the values of the template unknowns back to the original state variables: each template, instantiated with
+        the model, is rewritten in the original variables, and each unknown takes the coefficient of its monomial.
+        The other values (e.g., epsilon) are kept as is.
+        This is only possible if the restored templates have no monomial without an unknown and the monomials that share an
+        unknown (symmetric templates) get equal coefficients, which fails, e.g., for non-dense template bases with `box`.
+        The restored model is therefore checked: the templates instantiated with it are evaluated at `samples` points, and
+        must agree with the templates instantiated with the original model at the rescaled points. Returns None otherwise.
+        """
+        try:
+            values = _model_values(model)
+        except ValueError as e:
+            logger.warning(f"The model cannot be mapped back to the original state variables ({e}).")
+            return None
+        restored = dict(model)
+        restored_values = dict(values)
+        for template in templates.values():
+            polynomial = self.restore_equation(Equation.from_polynomial(_instantiate(template, values))).to_polynomial()
+            for name, (key, coefficient) in _unknown_monomials(template).items():
+                value = polynomial.terms.get(key, 0)
+                restored_values[name] = value if coefficient == 1 else value / coefficient
+                restored[name] = _to_smt(restored_values[name])
+        if not self._evaluates_alike(templates, values, restored_values, samples):
+            logger.warning(
+                "The templates cannot carry the certificate in the original state variables (see `certificates` in the "
+                "solver result); the model is kept in the rescaled variables."
+            )
+            return None
+        return restored
+
+    def _evaluates_alike(self, templates: Mapping[str, Equation], values: dict[str, Fraction], restored_values: dict[str, Number], samples: int) -> bool:
+        if not templates:
+            return True
+        variables = [f"S{i}" for i in range(1, len(self.center) + 1)]
+        unknowns = {name for template in templates.values() for name in _unknown_monomials(template)}
+        scaled_points = np.random.default_rng(0).uniform(-1, 1, size=(samples, len(variables)))
+        original_points = np.array([float(c) for c in self.center]) + scaled_points * np.array([float(s) for s in self.scale])
+        rescaled = PolynomialEvaluator.from_dict(templates, variables, constants={name: values.get(name, 0) for name in unknowns})(scaled_points)
+        restored = PolynomialEvaluator.from_dict(templates, variables, constants={name: restored_values.get(name, 0) for name in unknowns})(original_points)
+        return bool(np.allclose(restored, rescaled, rtol=1e-6, atol=1e-9 * max(1.0, float(np.abs(rescaled).max()))))
+
+    def __str__(self):
+        return ", ".join(
+            f"S{i} = {Coefficients.to_string(c)} + {Coefficients.to_string(s)} * S~{i}" if c != 0 else f"S{i} = {Coefficients.to_string(s)} * S~{i}"
+            for i, (c, s) in enumerate(zip(self.center, self.scale), start=1)
+        )
+
+
+def _bounding_box(space: SystemSpace, state_dimension: int) -> list[list[Optional[Number]]]:
+    """
+    The tightest [lower, upper] bounds of each state variable given by the inequalities a * S_i + b >= 0 of the space.
+    """
+    box = [[None, None] for _ in range(state_dimension)]
+    positions = {f"S{i}": i - 1 for i in range(1, state_dimension + 1)}
+    for inequality in space.space_inequalities:
+        polynomial = inequality.left_equation.to_polynomial()
+        linear = [
+            (basis.decode(key), coefficient)
+            for key, coefficient in polynomial.terms.items()
+            if key != MonomialBasis.CONSTANT
+        ]
+        if len(linear) != 1:
+            continue
+        ((v, p),), a = linear[0]
+        if p != 1 or v not in positions:
+            continue
+        bound = -polynomial.constant_value() / a
+        lower, upper = box[positions[v]]
+        if a > 0:
+            box[positions[v]][0] = bound if lower is None else max(lower, bound)
+        else:
+            box[positions[v]][1] = bound if upper is None else min(upper, bound)
+    return box
+
+
+def _model_values(model: dict[str, str]) -> dict[str, Fraction]:
+    return {name: _smt_value(value) for name, value in model.items()}
+
+
+def _unknown_monomials(template: Equation) -> dict[str, tuple[int, Number]]:
+    """
+    The unknowns of a template, each with the state monomial (interned key) it multiplies and the coefficient of the term.
+    Shared (tied) unknowns get one of their monomials.
+    """
+    unknowns = {}
+    for monomial in template.monomials:
+        state_part, unknown = [], None
+        for v, p in basis.decode(monomial.get_exponent_key()):
+            if _is_state_variable(v):
+                state_part.append((v, p))
+            else:
+                unknown = v
+        if unknown is not None:
+            unknowns[unknown] = (basis.from_names(state_part) if state_part else MonomialBasis.CONSTANT, monomial.coefficient)
+    return unknowns
+
+
+def _is_state_variable(name: str) -> bool:
+    return name.startswith("S") and name[1:].isdigit()
+
+
+def _instantiate(template: Equation, values: dict[str, Fraction]) -> SparsePolynomial:
+    return template.to_polynomial().compose({
+        name: SparsePolynomial.constant(Coefficients.from_value(values.get(name, 0)))
+        for name in _unknown_monomials(template)
+    })
+
+
+def polynomial_to_string(polynomial: SparsePolynomial) -> str:
+    if polynomial.is_zero():
+        return "0"
+    terms = []
+    for key, coefficient in polynomial.terms.items():
+        variables = " * ".join(v if p == 1 else f"{v}**{p}" for v, p in basis.decode(key))
+        magnitude = Coefficients.to_string(abs(coefficient))
+        term = magnitude if not variables else variables if abs(coefficient) == 1 else f"{magnitude} * {variables}"
+        terms.append(("- " if coefficient < 0 else "+ ") + term)
+    return " ".join(terms).removeprefix("+ ")
+
+
+def _smt_value(text) -> Fraction:
+    """
+    Reads a numeric SMT-LIB value of the solver model, e.g., "2.0", "(- 1.5)" or "(/ 1.0 3.0)".
+    """
+    if isinstance(text, Number):
+        return Fraction(text)
+    tokens = str(text).replace("(", " ( ").replace(")", " ) ").split()
+    value, position = _smt_term(tokens, 0)
+    if position != len(tokens):
+        raise ValueError(f"Unexpected value: {text}")
+    return value
+
+
+def _smt_term(tokens: list[str], position: int) -> tuple[Fraction, int]:
+    if position >= len(tokens):
+        raise ValueError("Unexpected end of value")
+    if tokens[position] != "(":
+        return Fraction(tokens[position]), position + 1
+    operator, position = tokens[position + 1], position + 2
+    operands = []
+    while position < len(tokens) and tokens[position] != ")":
+        operand, position = _smt_term(tokens, position)
+        operands.append(operand)
+    if not operands or position >= len(tokens):
+        raise ValueError(f"Invalid operation: {operator}")
+    if operator == "-":
+        value = -operands[0] if len(operands) == 1 else operands[0] - sum(operands[1:])
+    elif operator == "+":
+        value = sum(operands)
+    elif operator == "*":
+        value = Fraction(1)
+        for operand in operands:
+            value *= operand
+    elif operator == "/":
+        value = operands[0]
+        for operand in operands[1:]:
+            value /= operand
+    else:
+        raise ValueError(f"Unsupported operation: {operator}")
+    return value, position + 1
+
+
+def _to_smt(value: Number) -> str:
+    if isinstance(value, float):
+        return f"(- {-value})" if value < 0 else str(value)
+    value = Fraction(value)
+    magnitude = str(abs(value.numerator)) if value.denominator == 1 else f"(/ {abs(value.numerator)} {value.denominator})"
+    return f"(- {magnitude})" if value < 0 else magnitude
@@ -26,8 +26,14 @@ from .certificate.variableC_reach import TemplateVariablesConstraint
 from .config import SynthesisConfig
 from .dynamics import SystemDynamics
 from .noise import SystemStochasticNoise
+from .parallel import extract_constraints
 from .polyhorn_helper import CommunicationBridge
+from .polynomial.equation import Equation
+from .polynomial.parse_cache import parse_cache
+from .rescaling import StateRescaling, polynomial_to_string
 from .space import SystemSpace
+from .symmetry import state_symmetries
+from .template_basis import TemplateBasis, template_state_groups
 from .toolIO import IOParser
 
 BOLD = "\033[1m"
@@ -51,13 +57,14 @@ class RunningStage(Enum):
     PARSE_INPUT = 0
     PREPARE_REQUIREMENTS = 1
     CONSTRUCT_SYSTEM_STATES = 2
-    POLICY_PREPARATION = 3
-    SYNTHESIZE_INVARIANTS = 4
-    SYNTHESIZE_TEMPLATE = 5
-    GENERATE_CONSTRAINTS = 6
-    PREPARE_SOLVER_INPUTS = 7
-    RUN_SOLVER = 8
-    Done = 9
+    RESCALE_SYSTEM_STATES = 3
+    POLICY_PREPARATION = 4
+    SYNTHESIZE_INVARIANTS = 5
+    SYNTHESIZE_TEMPLATE = 6
+    GENERATE_CONSTRAINTS = 7
+    PREPARE_SOLVER_INPUTS = 8
+    RUN_SOLVER = 9
+    Done = 10
 
     def next(self):
         return RunningStage((self.value + 1) % len(RunningStage))
@@ -97,6 +104,7 @@ class Runner:
     output_path: str
     running_stage: RunningStage = field(init=False, default=RunningStage.PARSE_INPUT)
     history: dict = field(init=False, default_factory=dict)
+    jobs: int = 1  # worker processes for the constraint generation
 
     def __post_init__(self):
         if not self.output_path:
@@ -110,6 +118,7 @@ class Runner:
             RunningStage.PARSE_INPUT: self._run_stage_parsing,
             RunningStage.PREPARE_REQUIREMENTS: self._run_stage_prepare_req,
             RunningStage.CONSTRUCT_SYSTEM_STATES: self._run_stage_state_construction,
+            RunningStage.RESCALE_SYSTEM_STATES: self._run_stage_rescaling,
             RunningStage.POLICY_PREPARATION: self._run_stage_policy_preparation,
             RunningStage.SYNTHESIZE_INVARIANTS: self._run_stage_synthesize_invariants,
             RunningStage.SYNTHESIZE_TEMPLATE: self._run_template_synthesis,
@@ -185,12 +194,53 @@ class Runner:
 
         # visualize_automata(ldba, os.path.join(self.output_path, "ldba"))
 
+    @stage_logger
+    def _run_stage_rescaling(self):
+        predicates = list(self.history["initiator"].specification_pre["predicate_lookup"].values())
+        policy = [Equation.extract_equation_from_string(str(equation)) for equation in self.history["initiator"].actions_pre["policies"] or [] if equation]
+        rescaling = StateRescaling.from_space(
+            mode=self.history["initiator"].synthesis_config_pre["rescaling"],
+            space=self.history["space"],
+            state_dimension=self.history["sds"].state_dimension,
+        )
+        if rescaling is not None:
+            self.history["space"] = rescaling.rescale_space(self.history["space"])
+            self.history["initial_space"] = rescaling.rescale_space(self.history["initial_space"])
+            self.history["sds"] = rescaling.rescale_dynamics(self.history["sds"])
+            rescaling.rescale_automata(self.history["ldba"])
+            predicates = [rescaling.rescale_predicate(predicate) for predicate in predicates]
+            policy = [rescaling.rescale_equation(equation) for equation in policy]
+            print("+ Rescaled the 'System States' successfully.")
+            print(f"  + {rescaling}")
+        self.history["rescaling"] = rescaling
+
+        # The template basis is built in the (rescaled) variables of the templates.
+        symmetries = state_symmetries(
+            spec=self.history["initiator"].synthesis_config_pre["symmetry"],
+            system_dynamics=self.history["sds"],
+            spaces=[self.history["space"], self.history["initial_space"]],
+            predicates=predicates,
+            disturbance=self.history["disturbance"],
+            policy=policy,
+        )
+        template_basis = TemplateBasis.from_system(
+            spec=self.history["initiator"].synthesis_config_pre["template_basis"],
+            system_dynamics=self.history["sds"],
+            spaces=[self.history["space"], self.history["initial_space"]],
+            predicates=predicates,
+            symmetries=symmetries,
+        )
+        self.history["template basis"] = template_basis
+
     @stage_logger
     def _run_stage_policy_preparation(self):
         policy = SystemDecomposedControlPolicy(
             **self.history["initiator"].actions_pre,
-            abstraction_dimension=len(self.history["ldba"].accepting_component_ids)
+            abstraction_dimension=len(self.history["ldba"].accepting_component_ids),
+            template_basis=self.history["template basis"]
         )
+        if self.history["rescaling"] is not None:
+            self.history["rescaling"].rescale_policy(policy)
         self.history["control policy"] = policy
         print(f"  + {policy}")
 
@@ -207,6 +257,7 @@ class Runner:
             action_dimension=self.history["initiator"].sds_pre["action_dimension"],
             abstraction_dimension=len(self.history["ldba"].states),
             maximal_polynomial_degree=self.history["initiator"].synthesis_config_pre["maximal_polynomial_degree"],
+            template_basis=self.history["template basis"],
         )
         print("+ Synthesized 'Invariant Template' successfully.")
         print(f"  + {inv_template}")
@@ -253,7 +304,12 @@ class Runner:
             abstraction_dimension=len(self.history["ldba"].states),
             accepting_components_count=len(self.history["ldba"].accepting_component_ids),
             maximal_polynomial_degree=self.history["initiator"].synthesis_config_pre["maximal_polynomial_degree"],
-            variables=certificate_variables
+            variables=certificate_variables,
+            template_basis=self.history["template basis"],
+            state_groups=template_state_groups(
+                spec=self.history["initiator"].synthesis_config_pre["template_sharing"],
+                automata=self.history["ldba"],
+            )
         )
         print("+ Synthesized 'Certificate Templates' successfully.")
         print(f"  + {template}")
@@ -288,10 +344,6 @@ class Runner:
             invariant=self.history["invariant template"],
             system_space=self.history["space"],
         )
-        non_negativity_constraints = non_negativity_generator.extract()
-        print("+ Generated 'Non-Negativity Constraints' successfully.")
-        # for t in non_negativity_constraints:
-        #     print(f"  + {t.to_detail_string()}")
 
         # safety_condition_handler = SafetyConditionHandler(
         #     template_manager=self.history["template"],
@@ -309,10 +361,6 @@ class Runner:
             system_dynamics=self.history["sds"],
             automata=self.history["ldba"]
         )
-        strict_expected_decrease_constraints = strict_expected_decrease_generator.extract()
-        print("+ Generated 'Strict Expected Decrease Constraints' successfully.")
-        # for t in strict_expected_decrease_constraints:
-        #     print(f"  + {t.to_detail_string()}")
 
         # bounded_expected_increase_generator = BoundedExpectedIncreaseConstraint(
         #     template_manager=self.history["template"],
@@ -334,29 +382,43 @@ class Runner:
             system_space=self.history["space"],
             decomposed_control_policy=self.history["control policy"]
         )
-        controller_bound_constraints = controller_boundary_generator.extract()
-        if len(controller_bound_constraints) > 0:
-            print("+ Generated 'Controller Boundary Constraints' successfully.")
-            # for t in controller_bound_constraints:
-            #     print(f"  + {t.to_detail_string()}")
 
         variables_gen = TemplateVariablesConstraint(
             template_manager=self.history["template"]
         )
-        variables_constraints = variables_gen.extract()
-        if len(variables_constraints) > 0:
+
+        constraints = extract_constraints(
+            generators={
+                "non_negativity": non_negativity_generator,
+                "strict_expected_decrease": strict_expected_decrease_generator,
+                "controller_bound": controller_boundary_generator,
+                "template_variables": variables_gen,
+            },
+            jobs=self.jobs,
+        )
+        print("+ Generated 'Non-Negativity Constraints' successfully.")
+        # for t in constraints["non_negativity"]:
+        #     print(f"  + {t.to_detail_string()}")
+        print("+ Generated 'Strict Expected Decrease Constraints' successfully.")
+        # for t in constraints["strict_expected_decrease"]:
+        #     print(f"  + {t.to_detail_string()}")
+        if len(constraints["controller_bound"]) > 0:
+            print("+ Generated 'Controller Boundary Constraints' successfully.")
+            # for t in constraints["controller_bound"]:
+            #     print(f"  + {t.to_detail_string()}")
+        if len(constraints["template_variables"]) > 0:
             print("+ Generated 'Template Variables Constraints' successfully.")
-            # for t in variables_constraints:
+            # for t in constraints["template_variables"]:
             #     print(f"  + {t.to_detail_string()}")
 
         self.history["constraints"] = {
-            "template_variables": variables_constraints,
+            "template_variables": constraints["template_variables"],
             # "initial_space": initial_space_constraints,
-            "non_negativity": non_negativity_constraints,
+            "non_negativity": constraints["non_negativity"],
             # "safety": safety_constraints,
-            "strict_expected_decrease": strict_expected_decrease_constraints,
+            "strict_expected_decrease": constraints["strict_expected_decrease"],
             # "bounded_expected_increase": bounded_expected_increase_constraints,
-            "controller_bound": controller_bound_constraints,
+            "controller_bound": constraints["controller_bound"],
         }
 
     @stage_logger
@@ -371,6 +433,8 @@ class Runner:
         print(f"  + From Control Policy: {len(self.history['control policy'].get_generated_constants())}")
         print(f"  + From Certificate Template: {len(self.history['template'].get_generated_constants())}")
         print(f"  + From Invariant Template: {len(self.history['invariant template'].get_generated_constants())}")
+        print(f"+ Parse cache: {parse_cache}")
+        self.history["parse cache"] = parse_cache.stats()
 
         polyhorn_input = CommunicationBridge.get_input_string(
             generated_constants=constants,
@@ -387,13 +451,38 @@ class Runner:
             temp_dir=self.output_path
         )
 
+    def _certificate_templates(self) -> dict[str, Equation]:
+        return {
+            **{f"V_reach_{q}": t for q, t in self.history["template"].template.sub_templates.items()},
+            **{f"I_{q}": t for q, t in getattr(self.history["invariant template"], "templates", {}).items()},
+            **{
+                f"{policy.prefix or f'P{k}'}_A{i}": equation
+                for k, policy in enumerate(self.history["control policy"].policies)
+                for i, equation in enumerate(policy.transitions or [], start=1)
+            },
+        }
+
     @stage_logger
     def _run_solver(self):
         result = CommunicationBridge.feed_to_polyhorn(self.output_path)
         print("+ Polyhorn solver completed.")
         print(f"  + Satisfiability: {result['is_sat']}")
         print(f"    Model:")
+        if self.history["rescaling"] is not None and result["model"]:
+            # The templates are synthesized in the rescaled variables; the certificates (and, if the templates can carry
+            # them, the model) are reported in the original ones.
+            templates = self._certificate_templates()
+            result["rescaled model"] = result["model"]
+            result["certificates"] = {
+                name: polynomial_to_string(polynomial)
+                for name, polynomial in self.history["rescaling"].restore_templates(result["model"], templates).items()
+            }
+            result["model"] = self.history["rescaling"].restore_model(result["model"], templates) or result["model"]
         result["model"] = fix_model_output(result["model"], self.history["ldba"])
         for k in sorted(result["model"].keys()):
             print(f"           {k}: {result["model"][k]}")
+        if "certificates" in result:
+            print(f"    Certificates (original state variables):")
+            for k, v in result["certificates"].items():
+                print(f"           {k}: {v}")
         self.history["solver_result"] = result
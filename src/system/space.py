@@ -1,9 +1,9 @@
-from functools import lru_cache
-
 from dataclasses import dataclass
 
 from .polynomial.equation import Equation
 from .polynomial.inequality import Inequality, EquationConditionType
+from .polynomial.parse_cache import parse_cache
+from .polynomial.polynomial import PolynomialParser
 
 
 _fix_comparators = lambda s: s.replace(" ", "") \
@@ -67,17 +67,20 @@ def _process_space_inequalities(inequality: str) -> list[Inequality]:
         )
     ]
 
-@lru_cache(maxsize=32)
 def extract_space_inequalities(string: str) -> list[Inequality]:
+    return list(parse_cache.get_or_parse(("space", PolynomialParser.context()), string, _extract_space_inequalities))
+
+
+def _extract_space_inequalities(string: str) -> tuple[Inequality, ...]:
     for token in _invalid_token_in_space:
         if token in string:
             raise ValueError(f"Invalid token in space inequality: {token} in {string}")
     string = string.replace("AND", "and").replace("&", "and")
-    return [
+    return tuple(
         p_ineq
         for _ieq in string.split("and")
         for p_ineq in _process_space_inequalities(_ieq)
-    ]
+    )
 
 @dataclass
 class SystemSpace:
@@ -0,0 +1,134 @@
+from itertools import combinations
+from typing import Iterable, Optional, Sequence
+
+from .dynamics import ConditionalDynamics, SystemDynamics
+from .log import logger
+from .noise import SystemStochasticNoise
+from .polynomial.equation import Equation
+from .polynomial.inequality import Inequality
+from .polynomial.sparse import PolynomialComposer
+from .space import SystemSpace, extract_space_inequalities
+
+
+__valid_symmetries__ = ["none", "auto"]
+
+
+def state_symmetries(
+        spec: str,
+        system_dynamics: SystemDynamics,
+        spaces: Iterable[SystemSpace],
+        predicates: Iterable[str],
+        disturbance: SystemStochasticNoise,
+        policy: Sequence[Equation] = (),
+        moment_order: int = 4,
+) -> list[tuple[int, ...]]:
+    """
+    The permutations of the state variables the templates are made invariant under, given by `symmetry` in the synthesis
+    config:
+        - "none": no symmetry (default);
+        - "auto": the transpositions of two state variables that map the dynamics (with their conditions), the spaces
+          and the predicates onto themselves, possibly together with a transposition of two identically distributed
+          disturbance components; they generate the symmetry group of the system.
+    With a provided (verification) `policy`, one equation per action, the dynamics are checked in closed loop, i.e.,
+    with the actions substituted by the policy. Each permutation is a tuple p of 0-based state indices, mapping S{k+1} to S{p[k]+1}.
+    """
+    if spec not in __valid_symmetries__:
+        raise ValueError(f"Invalid symmetry ({spec}). Choose one of {__valid_symmetries__}.")
+    if spec == "none":
+        return []
+    detector = SymmetryDetector(
+        system_dynamics=system_dynamics,
+        spaces=list(spaces),
+        predicates=list(predicates),
+        disturbance=disturbance,
+        policy=list(policy),
+        moment_order=moment_order,
+    )
+    symmetries = detector.detect()
+    logger.info(f"Symmetries of the state variables: {[_transposition_to_string(p) for p in symmetries]}.")
+    return symmetries
+
+
+class SymmetryDetector:
+    """
+    Tests the transpositions of the state variables against the canonical (hashable) forms of the system: the set of the
+    dynamics branches (in closed loop with a provided policy), each space and each predicate as a set of normalised inequalities.
+    """
+    __slots__ = ["state_dimension", "disturbance", "moment_order", "_branches", "_spaces", "_predicates", "_exchangeable"]
+
+    def __init__(self, system_dynamics: SystemDynamics, spaces: list[SystemSpace], predicates: list[str], disturbance: SystemStochasticNoise, policy: list[Equation], moment_order: int):
+        self.state_dimension = system_dynamics.state_dimension
+        self.disturbance = disturbance
+        self.moment_order = moment_order
+        closed_loop = Equation.composer({f"A{i}": equation for i, equation in enumerate(policy, start=1)}) if policy else None
+        self._branches = frozenset(_branch_key(dynamics, closed_loop) for dynamics in system_dynamics.system_transformations)
+        self._spaces = [frozenset(space.space_inequalities) for space in spaces]
+        self._predicates = [frozenset(extract_space_inequalities(predicate)) for predicate in predicates]
+        self._exchangeable = self._exchangeable_disturbances()
+
+    def detect(self) -> list[tuple[int, ...]]:
+        symmetries = []
+        for i, j in combinations(range(self.state_dimension), 2):
+            for disturbance_pair in [None] + self._exchangeable:
+                if self._is_symmetric(i, j, disturbance_pair):
+                    symmetries.append(tuple(j if k == i else i if k == j else k for k in range(self.state_dimension)))
+                    break
+        return symmetries
+
+    def _exchangeable_disturbances(self) -> list[tuple[int, int]]:
+        """
+        The pairs of disturbance components with the same bounds and marginal moments (up to `moment_order`); only for
+        independent components, as correlated ones are not exchangeable in general.
+        """
+        if not self.disturbance.noise_generators.independent:
+            return []
+        bounds = self.disturbance.get_bounds()
+        signatures = [
+            (
+                tuple(sorted(bounds.get(f"D{k + 1}", {}).items())),
+                tuple(self.disturbance.get_moment(k, order) for order in range(1, self.moment_order + 1)),
+            )
+            for k in range(self.disturbance.dimension)
+        ]
+        return [(k, l) for k, l in combinations(range(self.disturbance.dimension), 2) if signatures[k] == signatures[l]]
+
+    def _is_symmetric(self, i: int, j: int, disturbance_pair: Optional[tuple[int, int]]) -> bool:
+        renaming = {f"S{i + 1}": Equation.extract_equation_from_string(f"S{j + 1}"), f"S{j + 1}": Equation.extract_equation_from_string(f"S{i + 1}")}
+        if disturbance_pair is not None:
+            k, l = disturbance_pair
+            renaming.update({f"D{k + 1}": Equation.extract_equation_from_string(f"D{l + 1}"), f"D{l + 1}": Equation.extract_equation_from_string(f"D{k + 1}")})
+        composer = Equation.composer(renaming)
+
+        if any(_rename_inequalities(space, composer) != space for space in self._spaces):
+            return False
+        if any(_rename_inequalities(predicate, composer) != predicate for predicate in self._predicates):
+            return False
+        for condition, dynamics in self._branches:
+            # x' = f(x) is mapped onto itself iff f_k(tx) = f_t(k)(x) for every state variable k.
+            swapped = tuple(dynamics[j if k == i else i if k == j else k].compose(composer) for k in range(len(dynamics)))
+            if (_rename_inequalities(condition, composer), swapped) not in self._branches:
+                return False
+        return True
+
+
+def _branch_key(dynamics: ConditionalDynamics, closed_loop: Optional[PolynomialComposer]) -> tuple[frozenset, tuple[Equation, ...]]:
+    if closed_loop is None:
+        return frozenset(dynamics.condition), tuple(dynamics.dynamics)
+    return frozenset(dynamics.condition), tuple(equation.compose(closed_loop) for equation in dynamics.dynamics)
+
+
+def _rename_inequalities(inequalities: frozenset, composer: PolynomialComposer) -> frozenset:
+    return frozenset(
+        Inequality(
+            left_equation=inequality.left_equation.compose(composer),
+            inequality_type=inequality.inequality_type,
+            right_equation=inequality.right_equation,
+        )
+        for inequality in inequalities
+    )
+
+
+def _transposition_to_string(permutation: tuple[int, ...]) -> str:
+    i, j = (k for k, p in enumerate(permutation) if k != p)
+    return f"S{i + 1} <-> S{j + 1}"
+
@@ -0,0 +1,219 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from .automata.graph import Automata
+from .dynamics import SystemDynamics
+from .log import logger
+from .polynomial.equation import Equation
+from .polynomial.symbols import basis
+from .space import SystemSpace, extract_space_inequalities
+from .utils import exponent_matrix, power_generator
+
+
+__valid_template_bases__ = ["dense", "even", "newton"]
+__template_kinds__ = ["reach", "safe", "invariant", "policy"]
+__valid_template_sharings__ = ["none", "signature"]
+
+
+@dataclass
+class TemplateBasis:
+    """
+    Selects the monomials of the templates (certificates, invariants and policies), given by `template_basis` in the
+    synthesis config: either one option for all the templates, or a dict from the template kind ("reach", "safe",
+    "invariant", "policy") to an option; missing kinds are dense. The options are:
+        - "dense": all the monomials up to the template degree (default);
+        - "even": only the monomials of even total degree;
+        - "newton": the monomials of the d-fold Minkowski sum of the Newton polytope of the dynamics and the predicates,
+          i.e., the supports of (1 + sum of their monomials)^d over the state variables, up to degree d;
+        - a list of monomials, e.g., ["1", "S1**2", "S1*S2"].
+    The selected monomials keep their index in the dense basis, so the names of the unknowns do not depend on the option.
+    With `symmetries` (permutations of the state variables, see `symmetry.state_symmetries`), the templates are symmetric
+    polynomials: the monomials of an orbit share the unknown of their first monomial in the dense basis.
+    """
+    spec: Union[str, dict] = "dense"
+    state_dimension: int = 0
+    polynomials: list[Equation] = field(default_factory=list, repr=False)
+    symmetries: list[tuple[int, ...]] = field(default_factory=list)
+    _supports: dict[tuple[str, int], Optional[frozenset]] = field(init=False, default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        specs = self.spec.values() if isinstance(self.spec, dict) else [self.spec]
+        if isinstance(self.spec, dict) and not set(self.spec.keys()).issubset(__template_kinds__):
+            raise ValueError(f"Invalid template kinds ({list(self.spec.keys())}). Choose among {__template_kinds__}.")
+        for spec in specs:
+            if isinstance(spec, str) and spec not in __valid_template_bases__:
+                raise ValueError(f"Invalid template basis ({spec}). Choose one of {__valid_template_bases__} or give a list of monomials.")
+
+    @classmethod
+    def from_system(
+            cls,
+            spec: Union[str, dict],
+            system_dynamics: SystemDynamics,
+            spaces: Iterable[SystemSpace],
+            predicates: Iterable[str],
+            symmetries: Optional[list[tuple[int, ...]]] = None,
+    ) -> "TemplateBasis":
+        """
+        Collects the polynomials of the Newton polytope: the dynamics (and their conditions), the spaces and the predicates.
+        """
+        polynomials = []
+        for dynamics in system_dynamics.system_transformations:
+            polynomials.extend(dynamics.dynamics)
+            polynomials.extend(inequality.left_equation for inequality in dynamics.condition)
+        for space in spaces:
+            polynomials.extend(inequality.left_equation for inequality in space.space_inequalities)
+        for predicate in predicates:
+            polynomials.extend(inequality.left_equation for inequality in extract_space_inequalities(predicate))
+        return cls(spec=spec, state_dimension=system_dynamics.state_dimension, polynomials=polynomials, symmetries=list(symmetries or []))
+
+    def option(self, kind: str) -> Union[str, list]:
+        if isinstance(self.spec, dict):
+            return self.spec.get(kind, "dense")
+        return self.spec
+
+    def power_generator(self, kind: str, poly_max_degree: int) -> tuple:
+        """
+        The (constant postfix, powers) pairs of the template monomials, as `utils.power_generator`.
+        """
+        dense = power_generator(poly_max_degree=poly_max_degree, variable_generators=self.state_dimension)
+        support = self.support(kind, poly_max_degree)
+        selected = dense
+        if support is not None:
+            selected = tuple((postfix, powers) for postfix, powers in dense if powers in support)
+            logger.info(f"Template basis of the {kind} templates: {len(selected)} of {len(dense)} monomials.")
+        if self.symmetries:
+            selected = _tie_symmetric_monomials(selected, self.symmetries)
+            logger.info(f"Symmetric {kind} templates: {len({postfix for postfix, _ in selected})} unknowns for {len(selected)} monomials.")
+        return selected
+
+    def support(self, kind: str, poly_max_degree: int) -> Optional[frozenset]:
+        """
+        The exponent vectors of the selected monomials, or None for the dense basis.
+        """
+        key = (kind, poly_max_degree)
+        if key not in self._supports:
+            option = self.option(kind)
+            if option == "dense":
+                support = None
+            elif option == "even":
+                support = _even_support(poly_max_degree, self.state_dimension)
+            elif option == "newton":
+                support = _newton_support(self.polynomials, poly_max_degree, self.state_dimension)
+            else:
+                support = _explicit_support(option, poly_max_degree, self.state_dimension)
+            self._supports[key] = support
+        return self._supports[key]
+
+
+def _state_exponents(equation: Equation, state_dimension: int) -> set[tuple[int, ...]]:
+    """
+    The supports of an equation projected on the state variables S1, ..., Sn (the other variables are dropped).
+    """
+    positions = {f"S{i}": i - 1 for i in range(1, state_dimension + 1)}
+    exponents = set()
+    for monomial in equation.monomials:
+        powers = [0] * state_dimension
+        for v, p in basis.decode(monomial.get_exponent_key()):
+            if v in positions:
+                powers[positions[v]] = p
+        exponents.add(tuple(powers))
+    return exponents
+
+
+def _even_support(poly_max_degree: int, state_dimension: int) -> frozenset:
+    exponents = exponent_matrix(poly_max_degree, state_dimension)
+    return frozenset(map(tuple, exponents[exponents.sum(axis=1) % 2 == 0].tolist()))
+
+
+def _newton_support(polynomials: Iterable[Equation], poly_max_degree: int, state_dimension: int) -> frozenset:
+    generators = set()
+    for equation in polynomials:
+        generators |= _state_exponents(equation, state_dimension)
+    generators = np.array(sorted(generators), dtype=np.int64).reshape(-1, state_dimension)
+    support = np.zeros((1, state_dimension), dtype=np.int64)
+    for _ in range(poly_max_degree):
+        sums = (support[:, None, :] + generators[None, :, :]).reshape(-1, state_dimension)
+        support = np.unique(np.vstack([support, sums[sums.sum(axis=1) <= poly_max_degree]]), axis=0)
+    return frozenset(map(tuple, support.tolist()))
+
+
+def _explicit_support(monomials: list, poly_max_degree: int, state_dimension: int) -> frozenset:
+    support = set()
+    for monomial in monomials:
+        equation = Equation.extract_equation_from_string(str(monomial))
+        if len(equation.monomials) != 1:
+            raise ValueError(f"Invalid template monomial ({monomial}): expected a single monomial.")
+        variables = {v for v, _ in basis.decode(equation.monomials[0].get_exponent_key())}
+        if not variables.issubset({f"S{i}" for i in range(1, state_dimension + 1)}):
+            raise ValueError(f"Invalid template monomial ({monomial}): only the state variables S1..S{state_dimension} are allowed.")
+        powers, = _state_exponents(equation, state_dimension)
+        if sum(powers) > poly_max_degree:
+            raise ValueError(f"Invalid template monomial ({monomial}): its degree exceeds the maximal degree {poly_max_degree}.")
+        support.add(powers)
+    return frozenset(support)
+
+
+def _tie_symmetric_monomials(generator: tuple, symmetries: list[tuple[int, ...]]) -> tuple:
+    """
+    Renames the postfix of each monomial to the one of the first monomial of its orbit, among the selected monomials.
+    """
+    postfixes = {powers: postfix for postfix, powers in generator}
+    orbits = _symmetric_orbits(postfixes.keys(), symmetries)
+    return tuple(
+        (min((postfixes[member] for member in orbits[powers] if member in postfixes), key=int), powers)
+        for _, powers in generator
+    )
+
+
+def _symmetric_orbits(exponents: Iterable[tuple[int, ...]], symmetries: list[tuple[int, ...]]) -> dict[tuple[int, ...], frozenset]:
+    """
+    The orbit of each exponent vector under the group generated by the permutations of the state variables.
+    """
+    orbits = {}
+    for powers in exponents:
+        if powers in orbits:
+            continue
+        orbit, frontier = {powers}, [powers]
+        while frontier:
+            current = frontier.pop()
+            for permutation in symmetries:
+                image = [0] * len(current)
+                for k, p in enumerate(permutation):
+                    image[p] = current[k]
+                image = tuple(image)
+                if image not in orbit:
+                    orbit.add(image)
+                    frontier.append(image)
+        orbit = frozenset(orbit)
+        for member in orbit:
+            orbits[member] = orbit
+    return orbits
+
+
+def template_state_groups(spec: Union[str, list], automata: Automata) -> Optional[dict[int, int]]:
+    """
+    Groups the automaton states that share one certificate template, given by `template_sharing` in the synthesis config:
+        - "none": one template per state (default);
+        - "signature": the states with the same acceptance status and outgoing label structure;
+        - a list of groups of state ids, e.g., [[0, 2], [1, 3]] (the other states keep their own template).
+    Returns a map from each state to the representative (smallest) state of its group, or None without sharing.
+    """
+    if spec == "none":
+        return None
+    if spec == "signature":
+        groups = automata.group_states_by_signature()
+    elif isinstance(spec, list):
+        groups = {idx: idx for idx in range(len(automata.states))}
+        for group in spec:
+            for state_id in group:
+                if not 0 <= int(state_id) < len(automata.states):
+                    raise ValueError(f"Invalid state id ({state_id}) in the template sharing groups; the automaton has {len(automata.states)} states.")
+                if groups[int(state_id)] != int(state_id):
+                    raise ValueError(f"State {state_id} appears in more than one template sharing group.")
+                groups[int(state_id)] = min(map(int, group))
+    else:
+        raise ValueError(f"Invalid template sharing ({spec}). Choose one of {__valid_template_sharings__} or give a list of state groups.")
+    logger.info(f"Template sharing: {len(set(groups.values()))} templates for {len(groups)} automaton states.")
+    return groups
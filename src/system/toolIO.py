@@ -5,7 +5,9 @@ import os
 
 from .log import logger
 from .dynamics import ConditionalDynamics
+from .polynomial.coefficients import Coefficients
 from .polynomial.equation import Equation
+from .polynomial.parse_cache import parse_cache
 from .space import extract_space_inequalities
 
 def resolve_path(path, base_path):
@@ -96,6 +98,15 @@ class IOParser:
         return _structure
 
     def process_dict_to_tool_input(self, data: dict) -> ToolInput:
+        # The coefficient mode must be set before any polynomial (e.g., the dynamics) is parsed.
+        Coefficients.configure(
+            mode="exact" if data["synthesis_config"].get("exact_coefficients", False) else "float",
+            max_denominator=data["synthesis_config"].get("max_denominator", 10 ** 6)
+        )
+        parse_cache.configure(
+            maxsize=data["synthesis_config"].get("parse_cache_size", 4096),
+            eviction=data["synthesis_config"].get("parse_cache_eviction", "lru")
+        )
         _poly_max_ever = data["synthesis_config"]["maximal_polynomial_degree"]
         action_max_deg = data["actions"].get("maximal_polynomial_degree", _poly_max_ever) if "actions" in data else _poly_max_ever
         actions = {
@@ -109,10 +120,14 @@ class IOParser:
             }
         }
 
+        disturbance_parameters = dict(data["disturbance"]["disturbance_parameters"])
+        if "samples_path" in disturbance_parameters:
+            disturbance_parameters["samples_path"] = resolve_path(path=disturbance_parameters["samples_path"], base_path=os.path.dirname(self.input_files[0]))
+
         disturbance = {
             "dimension": data["stochastic_dynamical_system"]["disturbance_space_dimension"],
             "distribution_name": data["disturbance"]["distribution_name"],
-            "distribution_generator_parameters": data["disturbance"]["disturbance_parameters"],
+            "distribution_generator_parameters": disturbance_parameters,
         }
 
         _system_dynamic_equations = [
@@ -138,7 +153,11 @@ class IOParser:
             "probability_threshold": data["synthesis_config"]["probability_threshold"],
             "theorem_name": data["synthesis_config"]["theorem_name"],
             "solver_name": data["synthesis_config"]["solver_name"],
-            "owl_path": owl_path
+            "owl_path": owl_path,
+            "template_basis": data["synthesis_config"].get("template_basis", "dense"),
+            "template_sharing": data["synthesis_config"].get("template_sharing", "none"),
+            "symmetry": data["synthesis_config"].get("symmetry", "none"),
+            "rescaling": data["synthesis_config"].get("rescaling", "none")
         }
 
         hoa_path = data["specification"].get("hoa_path", None)
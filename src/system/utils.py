@@ -1,10 +1,56 @@
-from itertools import product
 from functools import lru_cache
-from typing import Union
+from typing import Any, Callable, Union
 
+import numpy as np
 
-@lru_cache(maxsize=4)
-def power_generator(poly_max_degree: int, variable_generators: Union[tuple[str], int]):
+
+__valid_orderings__ = ["lex", "graded", "graded_reverse_lex"]
+
+
+@lru_cache(maxsize=None)
+def _bounded_exponents(len_v: int, max_degree: int) -> np.ndarray:
+    """
+    All the exponent vectors of length `len_v` with total degree at most `max_degree`, in lexicographic order; built
+    directly (the first exponent, then the vectors of the remaining degree), so only the C(len_v + max_degree, max_degree)
+    rows are ever produced.
+    """
+    if len_v == 0:
+        return np.zeros((1, 0), dtype=np.int64)
+    blocks = []
+    for first in range(max_degree + 1):
+        rest = _bounded_exponents(len_v - 1, max_degree - first)
+        blocks.append(np.hstack([np.full((rest.shape[0], 1), first, dtype=np.int64), rest]))
+    return np.vstack(blocks)
+
+
+@lru_cache(maxsize=None)
+def exponent_matrix(poly_max_degree: int, len_v: int, ordering: Union[str, Callable[[tuple], Any]] = "lex") -> np.ndarray:
+    """
+    The (C(len_v + d, d) x len_v) matrix of the exponents of all the monomials of degree at most d = `poly_max_degree`.
+    `ordering` is "lex" (lexicographic, the constant first), "graded" (by total degree, then lexicographic),
+    "graded_reverse_lex" (by total degree, then reverse lexicographic) or a sort key on the exponent tuples.
+    The matrix is cached and read-only.
+    """
+    exponents = _bounded_exponents(len_v, poly_max_degree)
+    degrees = exponents.sum(axis=1)
+    if callable(ordering):
+        order = sorted(range(exponents.shape[0]), key=lambda i: ordering(tuple(exponents[i].tolist())))
+    elif ordering == "lex":
+        order = np.arange(exponents.shape[0])
+    elif ordering == "graded":
+        order = np.argsort(degrees, kind="stable")
+    elif ordering == "graded_reverse_lex":
+        # np.lexsort sorts by the last key first: the degree, then the negated exponents from the last variable.
+        order = np.lexsort(tuple(-exponents[:, j] for j in range(len_v)) + (degrees,))
+    else:
+        raise ValueError(f"Invalid monomial ordering ({ordering}). Choose one of {__valid_orderings__} or give a sort key.")
+    exponents = exponents[order]
+    exponents.setflags(write=False)
+    return exponents
+
+
+@lru_cache(maxsize=None)
+def power_generator(poly_max_degree: int, variable_generators: Union[tuple[str], int], ordering: Union[str, Callable[[tuple], Any]] = "lex"):
     """
     The output is designed as a list of tuples (constant, powers) where the constant is a string and the powers is a tuple of integers, corresponding to the powers of the variables in the polynomial, with the same order as the input.
     """
@@ -13,10 +59,7 @@ def power_generator(poly_max_degree: int, variable_generators: Union[tuple[str],
     else:
         len_v = len(variable_generators)
 
-    power_combinations = product(range(poly_max_degree + 1), repeat=len_v)
-    power_combinations = (powers for powers in power_combinations if sum(powers) <= poly_max_degree)
-
     return tuple(
-        (str(i), powers)
-        for i, powers in enumerate(power_combinations, start=1)
+        (str(i), tuple(powers))
+        for i, powers in enumerate(exponent_matrix(poly_max_degree, len_v, ordering).tolist(), start=1)
     )
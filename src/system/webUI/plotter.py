@@ -1,31 +1,32 @@
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-from sympy import symbols, lambdify
 
 from ..dynamics import ConditionalDynamics
+from ..polynomial.equation import Equation
+from ..polynomial.evaluator import PolynomialEvaluator
 
 
-def _parse_dynamics_sympy(dynamics_strings):
+def _vector_field(dynamics: list[Equation]) -> PolynomialEvaluator:
     """
-    Parses a list of dynamics equations using SymPy and returns a callable function.
+    Compiles the displacement S' - S of two-dimensional dynamics into an evaluator over (S1, S2).
     """
-    S1, S2 = symbols("S1 S2")
-    dynamics_exprs = [lambdify((S1, S2), expr, "numpy") for expr in dynamics_strings]
-    return lambda S1, S2: (dynamics_exprs[0](S1, S2), dynamics_exprs[1](S1, S2))
+    return PolynomialEvaluator.from_dict(
+        {f"S{i}": equation.sub(Equation.extract_equation_from_string(f"S{i}")) for i, equation in enumerate(dynamics, start=1)},
+        variables=["S1", "S2"],
+    )
 
 
-def _plot_system(dynamics_strings, boundary_min, boundary_max, grid_points=50, highlight_region=None):
+def _plot_system(vector_field: PolynomialEvaluator, boundary_min, boundary_max, grid_points=50, highlight_region=None):
     """
-    Plots the system's streamlines based on dynamics provided as strings.
+    Plots the system's streamlines; the vector field is evaluated on the whole grid at once.
     """
-    dynamics = _parse_dynamics_sympy(dynamics_strings)
-
     S1 = np.linspace(boundary_min, boundary_max, grid_points)
     S2 = np.linspace(boundary_min, boundary_max, grid_points)
     S1_grid, S2_grid = np.meshgrid(S1, S2)
 
-    U, V = dynamics(S1_grid, S2_grid)
+    values = vector_field(np.column_stack([S1_grid.ravel(), S2_grid.ravel()]))
+    U, V = values[:, 0].reshape(S1_grid.shape), values[:, 1].reshape(S1_grid.shape)
 
     norm = np.sqrt(U ** 2 + V ** 2)
     U /= norm + 1e-5
@@ -58,9 +59,13 @@ def plot_dynamics_from_conditional_eq(conditional_equations: list[ConditionalDyn
     if len(conditional_equations[0].dynamics) != 2:
         st.error("Only two dimensional dynamics are supported for plotting.")
         return
-    transformations = [f"{str(d)}-S{i}" for i, d in enumerate(conditional_equations[0].dynamics, start=1)]
+    try:
+        vector_field = _vector_field(conditional_equations[0].dynamics)
+    except ValueError as e:
+        st.error(f"The dynamics cannot be plotted: {e}")
+        return
 
-    fig = _plot_system(transformations, -5, 5)
+    fig = _plot_system(vector_field, -5, 5)
     st.pyplot(fig)
 
 